@@ -8,7 +8,8 @@ from alembic import context
 # ✅ Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.database import Base, DATABASE_URL
+from app.db.base import Base
+from app.core.config import settings
 from app import models
 
 # Load Alembic config
@@ -19,7 +20,7 @@ fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 def run_migrations_offline():
-    url = DATABASE_URL
+    url = settings.DATABASE_URL
     context.configure(
         url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
     )
@@ -27,6 +28,8 @@ def run_migrations_offline():
         context.run_migrations()
 
 def run_migrations_online():
+    # Same database as offline mode and the app; '%' is escaped for configparser interpolation
+    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix='sqlalchemy.',
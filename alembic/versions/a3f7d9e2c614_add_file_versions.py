@@ -0,0 +1,53 @@
+"""add file versions
+
+Revision ID: a3f7d9e2c614
+Revises: f8d4c2e6a913
+Create Date: 2026-10-19 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'a3f7d9e2c614'
+down_revision = 'f8d4c2e6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("files", sa.Column("version", sa.Integer, nullable=True, server_default="1"))
+    op.create_table(
+        "file_versions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("file_id", sa.Integer, sa.ForeignKey("files.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("version", sa.Integer, nullable=False),
+        sa.Column("storage_type", sa.String, nullable=False),
+        sa.Column("storage_key", sa.String, nullable=False),
+        sa.Column("file_size", sa.Integer, nullable=True),
+        sa.Column("content_encoding", sa.String, nullable=True),
+        sa.Column("sha256", sa.String(64), nullable=True),
+        sa.Column("uploaded_by", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.text("now()")),
+        sa.UniqueConstraint("file_id", "version", name="uq_file_versions_file_version"),
+    )
+    op.create_index("ix_file_versions_id", "file_versions", ["id"])
+    op.create_index("ix_file_versions_file_id", "file_versions", ["file_id"])
+    op.create_index("ix_file_versions_storage_key", "file_versions", ["storage_key"])
+    op.create_index("ix_file_versions_sha256", "file_versions", ["sha256"])
+
+    # Existing files become version 1 of themselves
+    op.execute(
+        "INSERT INTO file_versions (file_id, version, storage_type, storage_key, file_size, content_encoding, sha256, uploaded_by, created_at) "
+        "SELECT id, 1, COALESCE(storage_type, 's3'), storage_key, file_size, content_encoding, sha256, uploaded_by, created_at "
+        "FROM files WHERE storage_key IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_file_versions_sha256", table_name="file_versions")
+    op.drop_index("ix_file_versions_storage_key", table_name="file_versions")
+    op.drop_index("ix_file_versions_file_id", table_name="file_versions")
+    op.drop_index("ix_file_versions_id", table_name="file_versions")
+    op.drop_table("file_versions")
+    op.drop_column("files", "version")
@@ -0,0 +1,50 @@
+"""add hot path indexes
+
+Revision ID: b41f2c9d8e10
+Revises: 7e5cd6b0196e
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers
+revision = 'b41f2c9d8e10'
+down_revision = '7e5cd6b0196e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Collapse duplicate grants before enforcing one permission per (folder, user),
+    # keeping the strongest one so nobody loses access they had
+    op.execute("""
+    DELETE FROM folder_permissions
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY folder_id, user_id
+                ORDER BY CASE permission::text WHEN 'admin' THEN 0 WHEN 'editor' THEN 1 ELSE 2 END, id
+            ) AS rank
+            FROM folder_permissions
+        ) ranked
+        WHERE rank > 1
+    );
+    """)
+    op.create_unique_constraint("uq_folder_permissions_folder_user", "folder_permissions", ["folder_id", "user_id"])
+
+    # list_folders / permission checks look up by user first; including permission makes it covering
+    op.create_index("ix_folder_permissions_user_folder", "folder_permissions", ["user_id", "folder_id", "permission"])
+
+    op.create_index("ix_folders_parent_id", "folders", ["parent_id"])
+    op.create_index("ix_folders_owner_id", "folders", ["owner_id"])
+    op.create_index("ix_files_folder_id", "files", ["folder_id"])
+    op.create_index("ix_files_uploaded_by", "files", ["uploaded_by"])
+
+
+def downgrade():
+    op.drop_index("ix_files_uploaded_by", table_name="files")
+    op.drop_index("ix_files_folder_id", table_name="files")
+    op.drop_index("ix_folders_owner_id", table_name="folders")
+    op.drop_index("ix_folders_parent_id", table_name="folders")
+    op.drop_index("ix_folder_permissions_user_folder", table_name="folder_permissions")
+    op.drop_constraint("uq_folder_permissions_folder_user", "folder_permissions", type_="unique")
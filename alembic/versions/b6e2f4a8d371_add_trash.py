@@ -0,0 +1,34 @@
+"""add trash (soft delete)
+
+Revision ID: b6e2f4a8d371
+Revises: a3f7d9e2c614
+Create Date: 2026-10-19 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'b6e2f4a8d371'
+down_revision = 'a3f7d9e2c614'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("files", sa.Column("deleted_at", sa.DateTime, nullable=True))
+    op.add_column("folders", sa.Column("deleted_at", sa.DateTime, nullable=True))
+    # Live listings only index live rows; the purger only indexes the trash
+    op.create_index("ix_files_folder_id_live", "files", ["folder_id"], postgresql_where=sa.text("deleted_at IS NULL"))
+    op.create_index("ix_files_deleted_at", "files", ["deleted_at"], postgresql_where=sa.text("deleted_at IS NOT NULL"))
+    op.create_index("ix_folders_parent_id_live", "folders", ["parent_id"], postgresql_where=sa.text("deleted_at IS NULL"))
+    op.create_index("ix_folders_deleted_at", "folders", ["deleted_at"], postgresql_where=sa.text("deleted_at IS NOT NULL"))
+
+
+def downgrade():
+    op.drop_index("ix_folders_deleted_at", table_name="folders")
+    op.drop_index("ix_folders_parent_id_live", table_name="folders")
+    op.drop_index("ix_files_deleted_at", table_name="files")
+    op.drop_index("ix_files_folder_id_live", table_name="files")
+    op.drop_column("folders", "deleted_at")
+    op.drop_column("files", "deleted_at")
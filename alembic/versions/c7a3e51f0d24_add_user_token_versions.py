@@ -0,0 +1,28 @@
+"""add user token versions
+
+Revision ID: c7a3e51f0d24
+Revises: b41f2c9d8e10
+Create Date: 2026-10-19 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'c7a3e51f0d24'
+down_revision = 'b41f2c9d8e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_token_versions",
+        sa.Column("user_id", sa.Integer, primary_key=True),
+        sa.Column("version", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.text("now()")),
+    )
+
+
+def downgrade():
+    op.drop_table("user_token_versions")
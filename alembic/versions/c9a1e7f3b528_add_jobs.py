@@ -0,0 +1,39 @@
+"""add jobs
+
+Revision ID: c9a1e7f3b528
+Revises: b6e2f4a8d371
+Create Date: 2026-10-19 16:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'c9a1e7f3b528'
+down_revision = 'b6e2f4a8d371'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("kind", sa.String, nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default="pending"),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("total", sa.Integer, server_default="0"),
+        sa.Column("completed", sa.Integer, server_default="0"),
+        sa.Column("result_id", sa.Integer, nullable=True),
+        sa.Column("error", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.text("now()")),
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"])
+    op.create_index("ix_jobs_user_id", "jobs", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_jobs_user_id", table_name="jobs")
+    op.drop_index("ix_jobs_id", table_name="jobs")
+    op.drop_table("jobs")
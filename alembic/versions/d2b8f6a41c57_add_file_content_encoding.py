@@ -0,0 +1,23 @@
+"""add file content encoding
+
+Revision ID: d2b8f6a41c57
+Revises: c7a3e51f0d24
+Create Date: 2026-10-19 11:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'd2b8f6a41c57'
+down_revision = 'c7a3e51f0d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("files", sa.Column("content_encoding", sa.String, nullable=True))
+
+
+def downgrade():
+    op.drop_column("files", "content_encoding")
@@ -0,0 +1,41 @@
+"""add media attributes
+
+Revision ID: d4b8e2a6f135
+Revises: c9a1e7f3b528
+Create Date: 2026-10-19 17:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'd4b8e2a6f135'
+down_revision = 'c9a1e7f3b528'
+branch_labels = None
+depends_on = None
+
+INDEXED = ("mime_type", "width", "height", "page_count", "duration")
+
+
+def upgrade():
+    op.create_table(
+        "media_attributes",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("mime_type", sa.String, nullable=True),
+        sa.Column("width", sa.Integer, nullable=True),
+        sa.Column("height", sa.Integer, nullable=True),
+        sa.Column("page_count", sa.Integer, nullable=True),
+        sa.Column("duration", sa.Float, nullable=True),
+        sa.Column("extracted_at", sa.DateTime, server_default=sa.text("now()")),
+    )
+    for column in INDEXED:
+        op.create_index(f"ix_media_attributes_{column}", "media_attributes", [column])
+    # Attributes are joined to files by digest
+    op.create_index("ix_files_sha256", "files", ["sha256"])
+
+
+def downgrade():
+    op.drop_index("ix_files_sha256", table_name="files")
+    for column in INDEXED:
+        op.drop_index(f"ix_media_attributes_{column}", table_name="media_attributes")
+    op.drop_table("media_attributes")
@@ -0,0 +1,23 @@
+"""add file sha256
+
+Revision ID: e5c1a9b37f02
+Revises: d2b8f6a41c57
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'e5c1a9b37f02'
+down_revision = 'd2b8f6a41c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("files", sa.Column("sha256", sa.String(64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("files", "sha256")
@@ -0,0 +1,43 @@
+"""add share links
+
+Revision ID: e7c3a1f5d846
+Revises: d4b8e2a6f135
+Create Date: 2026-10-19 18:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'e7c3a1f5d846'
+down_revision = 'd4b8e2a6f135'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "share_links",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("file_id", sa.Integer, sa.ForeignKey("files.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("folder_id", sa.Integer, sa.ForeignKey("folders.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("created_by", sa.Integer, sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("password_hash", sa.String, nullable=True),
+        sa.Column("max_downloads", sa.Integer, nullable=True),
+        sa.Column("download_count", sa.Integer, server_default="0"),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+        sa.Column("revoked_at", sa.DateTime, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.text("now()")),
+    )
+    op.create_index("ix_share_links_id", "share_links", ["id"])
+    op.create_index("ix_share_links_file_id", "share_links", ["file_id"])
+    op.create_index("ix_share_links_folder_id", "share_links", ["folder_id"])
+    op.create_index("ix_share_links_created_by", "share_links", ["created_by"])
+
+
+def downgrade():
+    op.drop_index("ix_share_links_created_by", table_name="share_links")
+    op.drop_index("ix_share_links_folder_id", table_name="share_links")
+    op.drop_index("ix_share_links_file_id", table_name="share_links")
+    op.drop_index("ix_share_links_id", table_name="share_links")
+    op.drop_table("share_links")
@@ -0,0 +1,36 @@
+"""add change log
+
+Revision ID: f8d4c2e6a913
+Revises: e5c1a9b37f02
+Create Date: 2026-10-19 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'f8d4c2e6a913'
+down_revision = 'e5c1a9b37f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("entity_type", sa.String, nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=False),
+        sa.Column("action", sa.String, nullable=False),
+        sa.Column("folder_id", sa.Integer, nullable=True),
+        sa.Column("old_folder_id", sa.Integer, nullable=True),
+        sa.Column("user_id", sa.Integer, nullable=True),
+        sa.Column("name", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.text("now()")),
+    )
+    op.create_index("ix_change_log_folder_id", "change_log", ["folder_id"])
+
+
+def downgrade():
+    op.drop_index("ix_change_log_folder_id", table_name="change_log")
+    op.drop_table("change_log")
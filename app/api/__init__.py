@@ -1,3 +1,8 @@
 from .users import router as users_router
 from .folders import router as folders_router
-from .files import router as files_router 
\ No newline at end of file
+from .files import router as files_router
+from .changes import router as changes_router
+from .events import router as events_router
+from .trash import router as trash_router
+from .jobs import router as jobs_router
+from .share import router as share_router
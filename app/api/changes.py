@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.schemas.change import ChangesPage
+from app.crud.change import get_changes_since, get_latest_change_id
+from app.crud.user import is_admin
+from app.api.deps import get_db, get_current_active_user, rate_limit
+
+router = APIRouter(prefix="/api/changes", tags=["changes"], dependencies=[Depends(rate_limit)])
+
+MAX_PAGE_SIZE = 1000
+
+@router.get("/", response_model=ChangesPage)
+def list_changes(
+    since: int = Query(0, ge=0, description="Cursor from the previous page; 0 for the full history"),
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    user_id = None if is_admin(current_user) else current_user.id
+    # Pin the upper bound first so the cursor can safely skip rows the caller can't see
+    head = get_latest_change_id(db)
+    # Fetch one extra row to know whether another page follows
+    changes = get_changes_since(db, since, head, user_id, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = changes[-1].id if has_more else max(head, since)
+    return {"changes": changes, "cursor": cursor, "has_more": has_more}
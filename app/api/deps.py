@@ -1,11 +1,14 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.models.user import User
-from app.core.security import oauth2_scheme
-from jose import jwt, JWTError
+from app.core.security import oauth2_scheme, decode_token
+from jose import JWTError
+from app.crud.user import get_user, get_user_by_id
+from app.schemas.token import TokenData
+from app.services.token_versions import token_versions
 from app.core.config import settings
-from app.crud.user import get_user
+from app.core import rate_limit as limits
 
 def get_db():
     db = SessionLocal()
@@ -21,12 +24,26 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = decode_token(token)
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("type", "access") != "access":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    # Fast path: role and is_active are signed into the token, so only the
+    # cached revocation list needs checking
+    if "uid" in payload and "role" in payload:
+        if token_versions.is_revoked(db, payload["uid"], payload.get("ver", 0)):
+            raise credentials_exception
+        return TokenData(
+            username=username,
+            id=payload["uid"],
+            role=payload["role"],
+            is_active=payload.get("active", True),
+        )
+
+    # Tokens issued before claims were added still resolve through the database
     user = get_user(db, username)  # Fixed: removed keyword argument
     if user is None:
         raise credentials_exception
@@ -35,4 +52,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+def get_current_db_user(current_user = Depends(get_current_active_user), db: Session = Depends(get_db)) -> User:
+    # For endpoints that need the full user row rather than the token claims
+    if isinstance(current_user, User):
+        return current_user
+    user = get_user_by_id(db, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    return user
+
+async def rate_limit(request: Request, current_user = Depends(get_current_active_user)):
+    # One bucket per user and route template, so a burst of listings can't starve uploads
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    rate, burst = limits.request_limit(current_user.role)
+    if not rate:
+        return
+    route = request.scope.get("route")
+    key = f"req:{current_user.id}:{request.method}:{getattr(route, 'path', request.url.path)}"
+    wait = await limits.take(key, rate, burst)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": limits.retry_after(wait)},
+        )
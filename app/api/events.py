@@ -0,0 +1,75 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from app.db.session import SessionLocal
+from app.models.folder import Folder
+from app.models.folder_permissions import FolderPermission
+from app.crud.user import is_admin
+from app.api.deps import get_current_user, get_current_active_user
+from app.services.events import broker
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token", auto_error=False)
+
+def authorize_folder_stream(
+    folder_id: int,
+    token: Optional[str] = Query(None, description="Access token for clients that cannot send headers (EventSource)"),
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    token = header_token or token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    # Own short-lived session: a get_db dependency would hold a connection for the whole stream
+    db = SessionLocal()
+    try:
+        current_user = get_current_active_user(get_current_user(token, db))
+        if not db.query(Folder.id).filter(Folder.id == folder_id, Folder.deleted_at.is_(None)).first():
+            raise HTTPException(status_code=404, detail="Folder not found")
+        if not is_admin(current_user):
+            permission = db.query(FolderPermission.id).filter(
+                FolderPermission.folder_id == folder_id,
+                FolderPermission.user_id == current_user.id
+            ).first()
+            if not permission:
+                raise HTTPException(status_code=403, detail="Insufficient permissions")
+    finally:
+        db.close()
+
+def format_event(message: dict) -> str:
+    # Set-based changes are pushed without a change log id; an empty "id:" would reset the client's Last-Event-ID
+    event_id = f"id: {message['id']}\n" if message.get("id") is not None else ""
+    return f"{event_id}event: {message['entity_type']}.{message['action']}\ndata: {json.dumps(message, default=str)}\n\n"
+
+@router.get("/folders/{folder_id}", dependencies=[Depends(authorize_folder_stream)])
+async def stream_folder_events(folder_id: int, request: Request):
+    """Server-sent events for changes in a folder and its direct children.
+
+    Each event's id is the change log cursor, so a client that reconnects can
+    fill any gap from /api/changes?since=<last id>.
+    """
+    async def event_stream():
+        queue = broker.subscribe(folder_id)
+        try:
+            yield f"retry: {HEARTBEAT_SECONDS * 1000}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps idle connections from being reaped by proxies
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_event(message)
+        finally:
+            broker.unsubscribe(folder_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
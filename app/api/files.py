@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, Header, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.schemas.file import FileCreate, FileOut, FileUpdate, FileMove
-from app.crud.file import create_file, get_file, delete_file, update_file, move_file
-from app.api.deps import get_db, get_current_active_user
+from typing import List, Optional, Tuple
+from app.schemas.file import FileCreate, FileOut, FileUpdate, FileMove, FileCopy, FileVersionOut, FileListFilters
+from app.crud.file import (
+    create_file, get_file, delete_file, update_file, move_file, get_file_by_name, add_file_version,
+    find_blob_by_digest, get_file_versions, restore_file_version, copy_file, list_folder_files,
+)
+from app.crud.media import get_media_attributes
+from app.api.deps import get_db, get_current_active_user, rate_limit
 from app.services.s3 import upload_file_to_s3, get_s3_download_url
-from app.services.local_storage import save_file_locally, get_local_file_url, delete_local_file
-from app.crud.folder import get_folder
+from app.services.local_storage import save_file_locally
+from app.services.blob import StoredBlob
+from app.services.local_serving import local_file_response, integrity_headers, matches_etag, media_type_for
+from fastapi.responses import Response
+from app.services.blob_cleanup import purge_blobs
+from app.services.listing_cache import cached_listing
+from app.services.media_metadata import media_source, schedule_extraction
+from app.crud.folder import get_folder, create_folder_paths
 from app.models.user import RoleEnum
-from app.models.file import File as FileModel
+from app.models.folder_permissions import FolderPermission
+from app.crud.user import is_admin
 from app.core.config import settings
-from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
 import os
 
 ALLOWED_EXTENSIONS = {
@@ -30,49 +43,102 @@ ALLOWED_EXTENSIONS = {
 MAX_FILE_SIZE_MB = 100
 MAX_FILES = 100
 
-router = APIRouter(prefix="/api/files", tags=["files"])
+router = APIRouter(prefix="/api/files", tags=["files"], dependencies=[Depends(rate_limit)])
 
 @router.get("/", response_model=List[FileOut])
 def list_files(
+    request: Request,
     folder_id: Optional[str] = Query(None, description="Folder ID or 'root' for root files"),
+    filters: FileListFilters = Depends(),
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
-    if folder_id == "root" or folder_id is None:
-        files = db.query(FileModel).filter(FileModel.folder_id == None).all()
-    else:
-        files = db.query(FileModel).filter(FileModel.folder_id == int(folder_id)).all()
-    return files
+    folder_id = None if folder_id == "root" or folder_id is None else int(folder_id)
+    
+    def load():
+        return [FileOut.model_validate(f) for f in list_folder_files(db, folder_id, filters)]
+    
+    # The file listing isn't filtered per user, so one cache entry per filter serves everyone
+    key = ("files", folder_id, tuple(filters.model_dump().values()))
+    return cached_listing(request, key, folder_id, None, load)
+
+def _can_upload(folder, current_user) -> bool:
+    # Check permissions for root folder
+    if folder.parent_id is None:
+        # Assume access_control is a JSON field; fall back to user role if missing
+        access_control = getattr(folder, 'access_control', None)
+        if access_control:
+            role = access_control.get(str(current_user.id)) or current_user.role
+        else:
+            role = current_user.role
+        if role not in [RoleEnum.admin, RoleEnum.editor]:
+            return False
+    return True
+
+def _parse_digests(x_content_sha256: Optional[str], count: int) -> List[str]:
+    expected_digests = [d.strip().lower() for d in x_content_sha256.split(",")] if x_content_sha256 else []
+    if expected_digests and len(expected_digests) != count:
+        raise HTTPException(status_code=400, detail="X-Content-SHA256 must list one digest per file")
+    return expected_digests
+
+async def _store_blob(file: UploadFile, storage_folder: str) -> Tuple[str, StoredBlob]:
+    if settings.STORAGE_BACKEND == "s3":
+        return "s3", await upload_file_to_s3(file, folder=storage_folder)
+    return "local", await run_in_threadpool(save_file_locally, file, storage_folder)
+
+def _record_upload(db: Session, folder_id: int, filename: str, user_id: int, storage_type: str, blob: StoredBlob):
+    # Returns the file row and the blobs to purge once it has committed.
+    # Identical content already stored: point at that blob instead of keeping a second copy
+    duplicate = []
+    existing_blob = find_blob_by_digest(db, storage_type, blob.sha256)
+    if existing_blob and existing_blob.storage_key != blob.storage_key:
+        duplicate = [(storage_type, blob.storage_key)]
+        blob = StoredBlob(existing_blob.storage_key, existing_blob.file_size, existing_blob.sha256, existing_blob.content_encoding)
+
+    # Re-uploading a name that already exists in the folder adds a version
+    existing_file = get_file_by_name(db, folder_id, filename)
+    if existing_file:
+        db_file, expired = add_file_version(
+            db, existing_file, user_id, storage_type, blob.storage_key, blob.size, blob.content_encoding, blob.sha256
+        )
+        return db_file, expired + duplicate
+    db_file = create_file(
+        db,
+        FileCreate(filename=filename, folder_id=folder_id),
+        user_id,
+        storage_type,
+        blob.storage_key,
+        blob.size,
+        blob.content_encoding,
+        blob.sha256,
+    )
+    return db_file, duplicate
 
 @router.post("/upload", response_model=List[FileOut])
 async def upload_files(
     folder_id: int, 
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...), 
+    x_content_sha256: Optional[str] = Header(None, description="Comma-separated hex SHA-256 per file, in upload order"),
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
     if len(files) > MAX_FILES:
         raise HTTPException(status_code=400, detail="Too many files (max 100)")
     
-    folder = get_folder(db, folder_id)
+    expected_digests = _parse_digests(x_content_sha256, len(files))
+    
+    # Everything blocking (DB, disk, boto3) goes through the threadpool so a
+    # slow write doesn't stall other requests on this worker's event loop
+    folder = await run_in_threadpool(get_folder, db, folder_id)
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
     
-    # Check permissions for root folder
-    if folder.parent_id is None:
-        # Assume access_control is a JSON field; fall back to user role if missing
-        access_control = getattr(folder, 'access_control', None)
-        if access_control:
-            role = access_control.get(str(current_user.id)) or current_user.role
-        else:
-            role = current_user.role
-        if role not in [RoleEnum.admin, RoleEnum.editor]:
-            raise HTTPException(status_code=403, detail="No upload permission")
+    if not _can_upload(folder, current_user):
+        raise HTTPException(status_code=403, detail="No upload permission")
     
     uploaded = []
-    for file in files:
-        ext = file.filename.split(".")[-1].lower() if "." in file.filename else ""
-        
+    for index, file in enumerate(files):
         file_content = await file.read()
         if len(file_content) > MAX_FILE_SIZE_MB * 1024 * 1024:
             raise HTTPException(status_code=400, detail="File too large")
@@ -89,26 +155,104 @@ async def upload_files(
         else:
             storage_folder = str(folder_id)
         
-        if settings.STORAGE_BACKEND == "s3":
-            storage_key = await upload_file_to_s3(file, folder=storage_folder)
-            storage_type = "s3"
-        else:
-            storage_key = save_file_locally(file, folder=storage_folder)
-            storage_type = "local"
-
-        db_file = create_file(db, FileCreate(filename=file.filename, folder_id=folder_id), current_user.id, storage_type, storage_key)
-        db_file.storage_type = storage_type
-        db_file.storage_key = storage_key
-        db_file.file_size = len(file_content)
-        db.commit()
-        db.refresh(db_file)
+        storage_type, blob = await _store_blob(file, storage_folder)
+        
+        if expected_digests and blob.sha256 != expected_digests[index]:
+            await run_in_threadpool(purge_blobs, [(storage_type, blob.storage_key)])
+            raise HTTPException(status_code=400, detail=f"Checksum mismatch for {file.filename}")
+
+        db_file, expired_blobs = await run_in_threadpool(
+            _record_upload, db, folder_id, file.filename, current_user.id, storage_type, blob
+        )
+        background_tasks.add_task(purge_blobs, expired_blobs)
         uploaded.append(db_file)
     
+    schedule_extraction(media_source(f) for f in uploaded)
+    return uploaded
+
+def _parse_manifest(manifest: str, count: int) -> List[Tuple[str, str]]:
+    # JSON list of relative paths, one per uploaded file in order -> [(directory, filename)]
+    try:
+        paths = json.loads(manifest)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Manifest must be a JSON list of relative paths")
+    if not isinstance(paths, list) or len(paths) != count:
+        raise HTTPException(status_code=400, detail="Manifest must list one relative path per file")
+    entries = []
+    for path in paths:
+        parts = str(path).replace("\\", "/").strip("/").split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise HTTPException(status_code=400, detail=f"Invalid path in manifest: {path}")
+        entries.append(("/".join(parts[:-1]), parts[-1]))
+    return entries
+
+@router.post("/upload-directory", response_model=List[FileOut])
+async def upload_directory(
+    folder_id: int,
+    background_tasks: BackgroundTasks,
+    manifest: str = Form(..., description='JSON list of relative paths, one per file in upload order, e.g. ["docs/a.pdf"]'),
+    files: List[UploadFile] = File(...),
+    x_content_sha256: Optional[str] = Header(None, description="Comma-separated hex SHA-256 per file, in upload order"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Upload a directory tree, recreating its folders under folder_id."""
+    if len(files) > MAX_FILES:
+        raise HTTPException(status_code=400, detail="Too many files (max 100)")
+    
+    entries = _parse_manifest(manifest, len(files))
+    expected_digests = _parse_digests(x_content_sha256, len(files))
+    if any(file.size is not None and file.size > MAX_FILE_SIZE_MB * 1024 * 1024 for file in files):
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    folder = await run_in_threadpool(get_folder, db, folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    
+    if not _can_upload(folder, current_user):
+        raise HTTPException(status_code=403, detail="No upload permission")
+    
+    # Blob writes are independent of each other, so they run concurrently;
+    # the DB work afterwards stays on this request's single session
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    
+    async def store(file: UploadFile, directory: str):
+        async with semaphore:
+            return await _store_blob(file, f"{folder_id}/{directory}" if directory else str(folder_id))
+    
+    results = await asyncio.gather(
+        *(store(file, directory) for file, (directory, _) in zip(files, entries)), return_exceptions=True
+    )
+    stored = [result for result in results if not isinstance(result, BaseException)]
+    failed = next((result for result in results if isinstance(result, BaseException)), None)
+    mismatch = next((
+        name for (_, name), result, expected in zip(entries, results, expected_digests)
+        if not isinstance(result, BaseException) and result[1].sha256 != expected
+    ), None)
+    if failed or mismatch:
+        await run_in_threadpool(purge_blobs, [(storage_type, blob.storage_key) for storage_type, blob in stored])
+        if mismatch:
+            raise HTTPException(status_code=400, detail=f"Checksum mismatch for {mismatch}")
+        raise failed
+    
+    folder_ids = await run_in_threadpool(
+        create_folder_paths, db, folder_id, {directory for directory, _ in entries}, current_user.id
+    )
+    uploaded = []
+    for (directory, name), (storage_type, blob) in zip(entries, results):
+        db_file, expired_blobs = await run_in_threadpool(
+            _record_upload, db, folder_ids[directory], name, current_user.id, storage_type, blob
+        )
+        background_tasks.add_task(purge_blobs, expired_blobs)
+        uploaded.append(db_file)
+    
+    schedule_extraction(media_source(f) for f in uploaded)
     return uploaded
 
 @router.get("/{file_id}/download")
 def download_file(
     file_id: int, 
+    request: Request,
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
@@ -130,6 +274,10 @@ def download_file(
         if role not in [RoleEnum.admin, RoleEnum.editor, RoleEnum.viewer]:
             raise HTTPException(status_code=403, detail="No download permission")
     
+    # Clients that already hold this content revalidate instead of re-downloading
+    if matches_etag(request.headers.get("if-none-match"), file.sha256):
+        return Response(status_code=304, headers=integrity_headers(file.sha256))
+    
     if file.storage_type == "s3":
         url = get_s3_download_url(file.storage_key)
         return {"url": url}
@@ -138,40 +286,24 @@ def download_file(
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="File not found on disk")
         
-        file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-        mime_types = {
-            'pdf': 'application/pdf',
-            'txt': 'text/plain',
-            'html': 'text/html',
-            'css': 'text/css',
-            'js': 'text/javascript',
-            'json': 'application/json',
-            'xml': 'text/xml',
-            'png': 'image/png',
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'gif': 'image/gif',
-            'svg': 'image/svg+xml',
-            'zip': 'application/zip',
-            'rar': 'application/x-rar-compressed',
-            'doc': 'application/msword',
-            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'xls': 'application/vnd.ms-excel',
-            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'ppt': 'application/vnd.ms-powerpoint',
-            'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
-        }
+        media_type = _media_type(db, file)
         
-        media_type = mime_types.get(file_ext, 'application/octet-stream')
-        
-        return FileResponse(
-            path=file_path,
-            filename=file.filename,
-            media_type=media_type
+        return local_file_response(
+            file.storage_key,
+            file.filename,
+            media_type,
+            content_encoding=file.content_encoding,
+            accept_encoding=request.headers.get("accept-encoding", ""),
+            original_size=file.file_size,
+            sha256=file.sha256,
         )
     else:
         raise HTTPException(status_code=500, detail="Unknown storage type")
 
+def _media_type(db: Session, file) -> str:
+    attributes = get_media_attributes(db, file.sha256)
+    return media_type_for(file.filename, attributes.mime_type if attributes else None)
+
 @router.put("/{file_id}", response_model=FileOut)
 def update_file_info(
     file_id: int, 
@@ -204,6 +336,77 @@ def move_file_to_folder(
     
     return move_file(db, file_id, move_request.new_folder_id)
 
+@router.post("/{file_id}/copy", response_model=FileOut, status_code=201)
+def copy_file_api(
+    file_id: int,
+    copy_request: FileCopy,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    file = get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    if current_user.role not in [RoleEnum.admin, RoleEnum.editor]:
+        raise HTTPException(status_code=403, detail="Not authorized to copy files")
+    
+    if not get_folder(db, copy_request.target_folder_id):
+        raise HTTPException(status_code=404, detail="Folder not found")
+    
+    # Same rule as folder copies: any access to the source, editor on the target
+    if not is_admin(current_user):
+        source_permission = file.folder_id is not None and db.query(FolderPermission).filter(
+            FolderPermission.folder_id == file.folder_id,
+            FolderPermission.user_id == current_user.id
+        ).first()
+        target_permission = db.query(FolderPermission).filter(
+            FolderPermission.folder_id == copy_request.target_folder_id,
+            FolderPermission.user_id == current_user.id,
+            FolderPermission.permission == RoleEnum.editor
+        ).first()
+        if not source_permission or not target_permission:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    filename = copy_request.filename or file.filename
+    if get_file_by_name(db, copy_request.target_folder_id, filename):
+        raise HTTPException(status_code=409, detail="A file with this name already exists in the target folder")
+    
+    return copy_file(db, file, copy_request.target_folder_id, filename, current_user.id)
+
+@router.get("/{file_id}/versions", response_model=List[FileVersionOut])
+def list_file_versions(
+    file_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    file = get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    return get_file_versions(db, file_id)
+
+@router.post("/{file_id}/versions/{version}/restore", response_model=FileOut)
+def restore_version(
+    file_id: int,
+    version: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    file = get_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    if file.uploaded_by != current_user.id and current_user.role not in [RoleEnum.admin, RoleEnum.editor]:
+        raise HTTPException(status_code=403, detail="Not authorized to modify this file")
+    
+    restored = restore_file_version(db, file, version, current_user.id)
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    db_file, expired_blobs = restored
+    background_tasks.add_task(purge_blobs, expired_blobs)
+    schedule_extraction([media_source(db_file)])
+    return db_file
+
 @router.delete("/{file_id}")
 def delete_file_api(
     file_id: int, 
@@ -217,9 +420,7 @@ def delete_file_api(
     if file.uploaded_by != current_user.id and current_user.role != RoleEnum.admin:
         raise HTTPException(status_code=403, detail="Not authorized to delete this file")
     
-    if file.storage_type == "local":
-        delete_local_file(file.storage_key)
-    
+    # Only marks the row; storage is reclaimed by the trash purger
     delete_file(db, file_id)
     
-    return {"msg": "File deleted successfully"}
\ No newline at end of file
+    return {"msg": "File moved to trash"}
\ No newline at end of file
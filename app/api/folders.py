@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from app.schemas.folder import FolderCreate, FolderOut, FolderUpdate
-from app.crud.folder import create_folder, get_folder, get_folders, update_folder, delete_folder
+from app.schemas.folder import FolderCreate, FolderOut, FolderUpdate, FolderCopy
+from app.schemas.job import JobOut
+from app.crud.folder import (
+    create_folder, get_folder, get_folders, update_folder, delete_folder, delete_folder_tree,
+    list_visible_folders, get_user_permission_folders, get_folder_permission_emails,
+    grant_folder_permission, revoke_folder_permission, is_in_subtree, count_subtree_files, copy_folder_tree,
+)
+from app.crud.job import create_job
+from app.services.copy_jobs import run_folder_copy_job
+from app.services.listing_cache import cached_listing
+from app.core.config import settings
 from app.crud.user import is_admin, can_edit
-from app.api.deps import get_db, get_current_active_user
+from app.api.deps import get_db, get_current_active_user, rate_limit
 from app.models.folder import Folder
 from app.models.folder_permissions import FolderPermission
 from app.models.user import RoleEnum, User
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/api/folders", tags=["folders"])
+router = APIRouter(prefix="/api/folders", tags=["folders"], dependencies=[Depends(rate_limit)])
 
 class FolderPermissionRequest(BaseModel):
     user_email: str
@@ -43,18 +52,19 @@ def create_folder_api(folder: FolderCreate, db: Session = Depends(get_db), curre
             FolderPermission.user_id == current_user.id
         ).first()
         if not existing_permission:
-            folder_permission = FolderPermission(
-                folder_id=new_folder.id,
-                user_id=current_user.id,
-                permission=RoleEnum.editor
-            )
-            db.add(folder_permission)
-            db.commit()
+            grant_folder_permission(db, new_folder.id, current_user.id, RoleEnum.editor)
     
     return new_folder
 
 @router.get("/", response_model=List[FolderOut])
-def list_folders(parent_id: str = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def list_folders(
+    request: Request,
+    parent_id: str = None,
+    page: Optional[int] = Query(None, ge=1, description="1-based page; omit for the full listing"),
+    page_size: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
     if parent_id in ["", "null", "undefined"]:
         parent_id = None
     elif parent_id is not None:
@@ -63,19 +73,13 @@ def list_folders(parent_id: str = None, db: Session = Depends(get_db), current_u
         except ValueError:
             parent_id = None
     
-    query = db.query(Folder)
-    if parent_id is not None:
-        query = query.filter(Folder.parent_id == parent_id)
-    else:
-        query = query.filter(Folder.parent_id.is_(None))
-    
-    if not is_admin(current_user):
-        query = query.join(FolderPermission, Folder.id == FolderPermission.folder_id, isouter=True).filter(
-            FolderPermission.user_id == current_user.id
-        )
-    
-    folders = query.all()
-    return folders
+    user_id = None if is_admin(current_user) else current_user.id
+    skip, limit = ((page - 1) * page_size, page_size) if page else (0, None)
+    # Admins share one cache entry per listing; everyone else gets their own
+    return cached_listing(
+        request, ("folders", user_id, parent_id, page, page_size), parent_id, user_id,
+        lambda: list_visible_folders(db, parent_id, user_id, skip, limit),
+    )
 
 @router.get("/{folder_id}", response_model=FolderOut)
 def get_folder_api(folder_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -111,7 +115,12 @@ def update_folder_api(folder_id: int, folder_update: FolderUpdate, db: Session =
     return update_folder(db, folder_id, folder_update)
 
 @router.delete("/{folder_id}")
-def delete_folder_api(folder_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_folder_api(
+    folder_id: int,
+    recursive: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
     folder = get_folder(db, folder_id)
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
@@ -119,8 +128,61 @@ def delete_folder_api(folder_id: int, db: Session = Depends(get_db), current_use
     if not is_admin(current_user):
         raise HTTPException(status_code=403, detail="Only admins can delete folders")
     
-    delete_folder(db, folder_id)
-    return {"msg": "Folder deleted successfully"}
+    if recursive:
+        files_trashed = delete_folder_tree(db, folder_id)
+        return {"msg": "Folder moved to trash", "files_deleted": files_trashed}
+    
+    try:
+        delete_folder(db, folder_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"msg": "Folder moved to trash"}
+
+@router.post("/{folder_id}/copy", response_model=Union[FolderOut, JobOut], status_code=201)
+def copy_folder_api(
+    folder_id: int,
+    copy_request: FolderCopy,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    folder = get_folder(db, folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    
+    if not can_edit(current_user):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    target_id = copy_request.target_parent_id
+    if target_id and not get_folder(db, target_id):
+        raise HTTPException(status_code=404, detail="Target folder not found")
+    
+    if not is_admin(current_user):
+        source_permission = db.query(FolderPermission).filter(
+            FolderPermission.folder_id == folder_id,
+            FolderPermission.user_id == current_user.id
+        ).first()
+        target_permission = target_id is None or db.query(FolderPermission).filter(
+            FolderPermission.folder_id == target_id,
+            FolderPermission.user_id == current_user.id,
+            FolderPermission.permission == RoleEnum.editor
+        ).first()
+        if not source_permission or not target_permission:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    if target_id and is_in_subtree(db, folder_id, target_id):
+        raise HTTPException(status_code=400, detail="Cannot copy a folder into itself")
+    
+    # Small trees are copied inline; large ones become a job the client polls at /api/jobs/{id}
+    total = count_subtree_files(db, folder_id)
+    if total > settings.COPY_INLINE_MAX_FILES:
+        job = create_job(db, "folder_copy", current_user.id, total)
+        background_tasks.add_task(run_folder_copy_job, job.id, folder_id, target_id, current_user.id, copy_request.name)
+        response.status_code = 202
+        return job
+    
+    return copy_folder_tree(db, folder_id, target_id, current_user.id, copy_request.name, settings.COPY_BATCH_SIZE)
 
 @router.get("/{folder_id}/permissions", response_model=List[str])
 def get_folder_permissions(folder_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -131,8 +193,7 @@ def get_folder_permissions(folder_id: int, db: Session = Depends(get_db), curren
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
     
-    permissions = db.query(FolderPermission).filter(FolderPermission.folder_id == folder_id).all()
-    return [perm.user.email for perm in permissions]
+    return get_folder_permission_emails(db, folder_id)
 
 @router.post("/{folder_id}/permissions")
 def manage_folder_permission(
@@ -170,13 +231,7 @@ def manage_folder_permission(
         if existing_permission:
             raise HTTPException(status_code=400, detail="Permission already exists")
         
-        new_permission = FolderPermission(
-            folder_id=folder_id,
-            user_id=user.id,
-            permission=permission_type
-        )
-        db.add(new_permission)
-        db.commit()
+        grant_folder_permission(db, folder_id, user.id, permission_type)
         return {"msg": "Permission added successfully"}
     else:
         permission = db.query(FolderPermission).filter(
@@ -186,8 +241,7 @@ def manage_folder_permission(
         if not permission:
             raise HTTPException(status_code=404, detail="Permission not found")
         
-        db.delete(permission)
-        db.commit()
+        revoke_folder_permission(db, permission)
         return {"msg": "Permission removed successfully"}
 
 @router.get("/users/{user_email}/folder_permissions", response_model=List[FolderOut])
@@ -199,5 +253,4 @@ def get_user_folder_permissions(user_email: str, db: Session = Depends(get_db),
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    folders = db.query(Folder).join(FolderPermission).filter(FolderPermission.user_id == user.id).all()
-    return folders
\ No newline at end of file
+    return get_user_permission_folders(db, user.id)
\ No newline at end of file
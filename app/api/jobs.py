@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.job import JobOut
+from app.crud.job import get_job
+from app.crud.user import is_admin
+from app.api.deps import get_db, get_current_active_user, rate_limit
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"], dependencies=[Depends(rate_limit)])
+
+@router.get("/{job_id}", response_model=JobOut)
+def get_job_api(job_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    job = get_job(db, job_id)
+    if not job or (job.user_id != current_user.id and not is_admin(current_user)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
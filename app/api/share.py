@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, Response
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from app.api.deps import get_db, get_current_active_user, rate_limit
+from app.core import rate_limit as limits
+from app.core.config import settings
+from app.core.security import get_password_hash_async, verify_password_async
+from app.crud.file import get_file
+from app.crud.folder import get_folder, is_in_subtree
+from app.crud.share import create_share_link, get_share_link, list_share_links, revoke_share_link
+from app.crud.user import can_edit, is_admin
+from app.models.file import File as FileModel
+from app.models.folder import Folder
+from app.models.folder_permissions import FolderPermission
+from app.schemas.share import (
+    ShareLinkCreate, ShareLinkOut, ShareUnlock, ShareToken, SharedItemOut, SharedFileOut, SharedFolderEntry,
+)
+from app.services.local_serving import integrity_headers, local_file_response, matches_etag
+from app.services.s3 import get_s3_download_url
+from app.services.share_links import (
+    InvalidShareToken, LinkState, SharedBlob, create_share_token, decode_share_token, download_counter,
+    downloads_left, link_cache, shared_blob, unlock_expiry,
+)
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(prefix="/api/share", tags=["share"])
+
+def _link_out(link, token: Optional[str] = None) -> ShareLinkOut:
+    out = ShareLinkOut.model_validate(link)
+    out.has_password = bool(link.password_hash)
+    out.token = token
+    return out
+
+@router.post("/", response_model=ShareLinkOut, status_code=201, dependencies=[Depends(rate_limit)])
+async def create_share_link_api(
+    share: ShareLinkCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    if (share.file_id is None) == (share.folder_id is None):
+        raise HTTPException(status_code=400, detail="Share exactly one of file_id or folder_id")
+    if not can_edit(current_user):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    if share.file_id is not None:
+        file = await run_in_threadpool(get_file, db, share.file_id)
+        if not file:
+            raise HTTPException(status_code=404, detail="File not found")
+        folder_id = file.folder_id
+    else:
+        folder_id = share.folder_id
+        if not await run_in_threadpool(get_folder, db, folder_id):
+            raise HTTPException(status_code=404, detail="Folder not found")
+
+    if not is_admin(current_user):
+        permission = await run_in_threadpool(
+            lambda: db.query(FolderPermission).filter(
+                FolderPermission.folder_id == folder_id,
+                FolderPermission.user_id == current_user.id
+            ).first()
+        )
+        if not permission:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    hours = share.expires_in_hours or settings.SHARE_LINK_DEFAULT_HOURS
+    if hours <= 0 or hours > settings.SHARE_LINK_MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"Links can last at most {settings.SHARE_LINK_MAX_HOURS} hours")
+    if share.max_downloads is not None and share.max_downloads <= 0:
+        raise HTTPException(status_code=400, detail="max_downloads must be positive")
+
+    password_hash = await get_password_hash_async(share.password) if share.password else None
+    link = await run_in_threadpool(
+        create_share_link, db, current_user.id, datetime.utcnow() + timedelta(hours=hours),
+        share.file_id, share.folder_id, password_hash, share.max_downloads,
+    )
+    return _link_out(link, create_share_token(link))
+
+@router.get("/", response_model=List[ShareLinkOut], dependencies=[Depends(rate_limit)])
+def list_share_links_api(db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    links = list_share_links(db, None if is_admin(current_user) else current_user.id)
+    return [_link_out(link) for link in links]
+
+@router.delete("/{link_id}", dependencies=[Depends(rate_limit)])
+def revoke_share_link_api(link_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    link = get_share_link(db, link_id)
+    if not link or (link.created_by != current_user.id and not is_admin(current_user)):
+        raise HTTPException(status_code=404, detail="Share link not found")
+    revoke_share_link(db, link)
+    link_cache.invalidate(link_id)
+    return {"msg": "Share link revoked"}
+
+# Public endpoints: the token is the credential
+
+def _open_link(token: str, db: Session) -> tuple:
+    # Signature and expiry come from the token; the cached state covers revocation and limits
+    try:
+        claims = decode_share_token(token)
+    except InvalidShareToken as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    state = link_cache.get(db, claims["lid"])
+    if state is None or state.revoked:
+        raise HTTPException(status_code=404, detail="Invalid or expired link")
+    return claims, state
+
+def _require_unlocked(claims: dict):
+    if claims.get("pw"):
+        raise HTTPException(status_code=401, detail="This link needs a password", headers={"WWW-Authenticate": "SharePassword"})
+
+def _expires_at(claims: dict) -> datetime:
+    return datetime.utcfromtimestamp(claims["exp"])
+
+def _shared_folder_id(db: Session, claims: dict, folder_id: Optional[int]) -> int:
+    # Folder links open their root or any live folder below it
+    root_id = claims.get("did")
+    if root_id is None:
+        raise HTTPException(status_code=404, detail="Not a folder link")
+    if folder_id is None or folder_id == root_id:
+        return root_id
+    if not is_in_subtree(db, root_id, folder_id):
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return folder_id
+
+@router.get("/s/{token}", response_model=SharedItemOut)
+def open_share_link(
+    token: str,
+    folder_id: Optional[int] = Query(None, description="Folder inside a shared folder tree; defaults to its root"),
+    db: Session = Depends(get_db)
+):
+    claims, state = _open_link(token, db)
+    _require_unlocked(claims)
+    item = SharedItemOut(expires_at=_expires_at(claims), downloads_left=downloads_left(claims["lid"], state))
+
+    if claims.get("fid") is not None:
+        file = db.query(FileModel).options(selectinload(FileModel.attributes)).filter(
+            FileModel.id == claims["fid"], FileModel.deleted_at.is_(None)
+        ).first()
+        if not file:
+            raise HTTPException(status_code=404, detail="File not found")
+        item.file = SharedFileOut.model_validate(file)
+        return item
+
+    current_id = _shared_folder_id(db, claims, folder_id)
+    folder = get_folder(db, current_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    item.folder = SharedFolderEntry.model_validate(folder)
+    item.folders = [
+        SharedFolderEntry.model_validate(f) for f in db.query(Folder).filter(
+            Folder.parent_id == current_id, Folder.deleted_at.is_(None)
+        ).order_by(Folder.name)
+    ]
+    item.files = [
+        SharedFileOut.model_validate(f) for f in db.query(FileModel).options(selectinload(FileModel.attributes)).filter(
+            FileModel.folder_id == current_id, FileModel.deleted_at.is_(None)
+        ).order_by(FileModel.filename)
+    ]
+    return item
+
+async def _limit_unlock_attempts(request: Request, link_id: int):
+    # Always on, unlike the per-user limits: anyone with the token can guess passwords
+    per_minute = settings.SHARE_UNLOCK_ATTEMPTS_PER_MINUTE
+    if per_minute <= 0:
+        return
+    client = request.client.host if request.client else "unknown"
+    for key in (f"unlock-ip:{client}", f"unlock-link:{link_id}"):
+        wait = await limits.take(key, per_minute / 60, per_minute)
+        if wait:
+            raise HTTPException(
+                status_code=429, detail="Too many attempts", headers={"Retry-After": limits.retry_after(wait)}
+            )
+
+@router.post("/s/{token}/unlock", response_model=ShareToken)
+async def unlock_share_link(token: str, unlock: ShareUnlock, request: Request, db: Session = Depends(get_db)):
+    try:
+        claims = decode_share_token(token)
+    except InvalidShareToken as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    await _limit_unlock_attempts(request, claims["lid"])
+    link = await run_in_threadpool(get_share_link, db, claims["lid"])
+    if not link or link.revoked_at is not None:
+        raise HTTPException(status_code=404, detail="Invalid or expired link")
+    if link.password_hash and not await verify_password_async(unlock.password, link.password_hash):
+        raise HTTPException(status_code=401, detail="Wrong password")
+    expires_at = unlock_expiry(link)
+    return ShareToken(token=create_share_token(link, expires_at, unlocked=True), expires_at=expires_at)
+
+def _counts_as_download(request: Request) -> bool:
+    # Resumed and parallel range requests for one download are only counted at the first byte
+    range_header = request.headers.get("range", "")
+    return not range_header or range_header.replace(" ", "").startswith("bytes=0-")
+
+def _serve_shared(request: Request, claims: dict, state: LinkState, blob: Optional[SharedBlob]) -> Response:
+    if blob is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    if matches_etag(request.headers.get("if-none-match"), blob.sha256):
+        return Response(status_code=304, headers=integrity_headers(blob.sha256))
+
+    if _counts_as_download(request) and not download_counter.try_record(claims["lid"], state):
+        raise HTTPException(status_code=410, detail="Download limit reached")
+
+    if blob.storage_type == "s3":
+        # The client follows the redirect and downloads (or range-reads) from S3 directly
+        return RedirectResponse(get_s3_download_url(blob.storage_key), status_code=307)
+    return local_file_response(
+        blob.storage_key,
+        blob.filename,
+        blob.media_type,
+        content_encoding=blob.content_encoding,
+        accept_encoding=request.headers.get("accept-encoding", ""),
+        original_size=blob.file_size,
+        sha256=blob.sha256,
+    )
+
+@router.get("/s/{token}/download")
+def download_shared_file(token: str, request: Request, db: Session = Depends(get_db)):
+    # File links are served entirely from the token and the cached link state
+    claims, state = _open_link(token, db)
+    _require_unlocked(claims)
+    if claims.get("fid") is None:
+        raise HTTPException(status_code=404, detail="Not a file link")
+    return _serve_shared(request, claims, state, state.blob)
+
+@router.get("/s/{token}/files/{file_id}/download")
+def download_file_in_shared_folder(token: str, file_id: int, request: Request, db: Session = Depends(get_db)):
+    claims, state = _open_link(token, db)
+    _require_unlocked(claims)
+    file = get_file(db, file_id)
+    if not file or file.folder_id is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    _shared_folder_id(db, claims, file.folder_id)
+    return _serve_shared(request, claims, state, shared_blob(db, file_id))
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.schemas.trash import TrashOut
+from app.schemas.file import FileOut
+from app.schemas.folder import FolderOut
+from app.crud.file import get_file_by_name
+from app.crud.trash import (
+    list_trashed_files, list_trashed_folders, get_trashed_file, get_trashed_folder,
+    restore_file, restore_folder_tree,
+)
+from app.crud.user import is_admin
+from app.api.deps import get_db, get_current_active_user, rate_limit
+
+router = APIRouter(prefix="/api/trash", tags=["trash"], dependencies=[Depends(rate_limit)])
+
+@router.get("/", response_model=TrashOut)
+def list_trash(db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    # Only admins delete folders, so everyone else just sees the files they uploaded
+    if is_admin(current_user):
+        return {"files": list_trashed_files(db), "folders": list_trashed_folders(db)}
+    return {"files": list_trashed_files(db, current_user.id), "folders": []}
+
+@router.post("/files/{file_id}/restore", response_model=FileOut)
+def restore_file_api(file_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    file = get_trashed_file(db, file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="File not found in trash")
+    
+    if file.uploaded_by != current_user.id and not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Not authorized to restore this file")
+    
+    # Two live files with one name would make re-uploads pick either of them as the one to version
+    if get_file_by_name(db, file.folder_id, file.filename):
+        raise HTTPException(status_code=409, detail="A file with this name already exists in the folder")
+    
+    try:
+        return restore_file(db, file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/folders/{folder_id}/restore", response_model=FolderOut)
+def restore_folder_api(folder_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Only admins can restore folders")
+    
+    folder = get_trashed_folder(db, folder_id)
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found in trash")
+    
+    try:
+        return restore_folder_tree(db, folder)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
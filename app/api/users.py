@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from app.schemas.user import UserCreate, UserOut, ForgotPasswordRequest, ResetPasswordRequest, UserLogin, AdminCreateUser, UserUpdate
-from app.schemas.token import Token
-from app.crud.user import create_user, get_user, get_users, update_user, delete_user, update_user_password, is_admin, can_edit, can_view
-from app.core.security import verify_password, create_access_token, get_password_hash
-from app.api.deps import get_db, get_current_active_user
-from app.services.email_service import email_service
+from app.schemas.token import Token, RefreshTokenRequest
+from app.crud.user import create_user, get_user, get_user_by_id, get_users, update_user, delete_user, update_user_password, is_admin, can_edit, can_view
+from app.core.security import create_user_tokens, decode_token, verify_password_async, get_password_hash_async
+from app.api.deps import get_db, get_current_active_user, get_current_db_user
+from app.crud.token import get_token_version
+from app.services.token_versions import revoke_user_tokens
+from jose import JWTError
+from app.services.email_service import get_email_service
 from app.models.user import RoleEnum
 import secrets
 import datetime
@@ -15,33 +19,34 @@ from typing import List
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if username or email already exists
-    existing_user = get_user(db, user.username)
+    existing_user = await run_in_threadpool(get_user, db, user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    existing_email = get_user(db, user.email)
+    existing_email = await run_in_threadpool(get_user, db, user.email)
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user with the specified role or default to viewer
     if not user.role:
         user.role = RoleEnum.viewer
-    new_user = create_user(db, user)
+    hashed_password = await get_password_hash_async(user.password)
+    new_user = await run_in_threadpool(create_user, db, user, hashed_password)
     
     # Send welcome email
     # try:
-    #     email_service.send_welcome_email(new_user.email, new_user.username)
+    #     get_email_service().send_welcome_email(new_user.email, new_user.username)
     # except Exception as e:
     #     print(f"Failed to send welcome email: {e}")
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = get_user(db, user_data.username)
-    if not user or not verify_password(user_data.password, user.hashed_password):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(get_user, db, user_data.username)
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
@@ -51,13 +56,13 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    token_version = await run_in_threadpool(get_token_version, db, user.id)
+    return create_user_tokens(user, token_version)
 
 @router.post("/token", response_model=Token)
-def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = get_user(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(get_user, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
@@ -67,11 +72,42 @@ def login_form(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    token_version = await run_in_threadpool(get_token_version, db, user.id)
+    return create_user_tokens(user, token_version)
+
+@router.post("/refresh", response_model=Token)
+def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(request.refresh_token)
+    except JWTError:
+        raise credentials_exception
+    if payload.get("type") != "refresh" or "uid" not in payload:
+        raise credentials_exception
+    
+    # Refresh is where role/is_active are re-read, so always hit the database
+    token_version = get_token_version(db, payload["uid"])
+    if payload.get("ver", 0) < token_version:
+        raise credentials_exception
+    
+    user = get_user_by_id(db, payload["uid"])
+    if not user or not user.is_active:
+        raise credentials_exception
+    
+    return create_user_tokens(user, token_version)
+
+@router.post("/logout")
+def logout(db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    # Revokes every token issued to the user, on all devices
+    revoke_user_tokens(db, current_user.id)
+    return {"msg": "Logged out successfully"}
 
 @router.get("/me", response_model=UserOut)
-def read_users_me(current_user = Depends(get_current_active_user)):
+def read_users_me(current_user = Depends(get_current_db_user)):
     return current_user
 
 @router.post("/forgot-password")
@@ -89,7 +125,7 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
     
     # Send email
     try:
-        email_service.send_password_reset_email(request.email, reset_token, user.username)
+        get_email_service().send_password_reset_email(request.email, reset_token, user.username)
         return {"msg": "Password reset link sent to your email"}
     except Exception as e:
         # Reset the token if email fails
@@ -112,24 +148,27 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
     if not updated_user:
         raise HTTPException(status_code=500, detail="Failed to update password")
     
+    revoke_user_tokens(db, user.id)
+    
     return {"msg": "Password reset successfully"}
 
 # Admin endpoints
 @router.post("/admin/create", response_model=UserOut)
-def admin_create_user(user: AdminCreateUser, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+async def admin_create_user(user: AdminCreateUser, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
     if not is_admin(current_user):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     # Check if username or email already exists
-    existing_user = get_user(db, user.username)
+    existing_user = await run_in_threadpool(get_user, db, user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    existing_email = get_user(db, user.email)
+    existing_email = await run_in_threadpool(get_user, db, user.email)
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    new_user = create_user(db, user)
+    hashed_password = await get_password_hash_async(user.password)
+    new_user = await run_in_threadpool(create_user, db, user, hashed_password)
     return new_user
 
 @router.get("/admin/users", response_model=List[UserOut])
@@ -149,6 +188,10 @@ def admin_update_user(user_id: int, user_update: UserUpdate, db: Session = Depen
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # role and is_active live in token claims, so outstanding tokens must be reissued
+    if user_update.role is not None or user_update.is_active is not None:
+        revoke_user_tokens(db, user_id)
+    
     return updated_user
 
 @router.delete("/admin/users/{user_id}")
@@ -163,4 +206,6 @@ def admin_delete_user(user_id: int, db: Session = Depends(get_db), current_user
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
+    revoke_user_tokens(db, user_id)
+    
     return {"msg": "User deleted successfully"} 
\ No newline at end of file
@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List, Tuple
 
 load_dotenv()
 
@@ -12,11 +12,21 @@ class Settings:
     AWS_S3_BUCKET: str = os.getenv('AWS_S3_BUCKET', '')
     AWS_REGION: str = os.getenv('AWS_REGION', 'us-east-1')
     SECRET_KEY: str = os.getenv('SECRET_KEY', 'supersecretkey')
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '1440'))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', '7'))
+    TOKEN_VERSION_REFRESH_SECONDS: float = float(os.getenv('TOKEN_VERSION_REFRESH_SECONDS', '30'))
     CORS_ORIGINS: str = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000')
     STORAGE_BACKEND: str = os.getenv('STORAGE_BACKEND', 'local')
     LOCAL_UPLOADS_PATH: str = os.getenv('LOCAL_UPLOADS_PATH', 'uploads')
-    ALGORITHM: str = os.getenv('ALGORITHM', 'SH256')
+    # 'sharded' (ab/cd/<uuid>) or 'folder' (legacy <folder_id>/<client path>/<uuid>)
+    LOCAL_STORAGE_LAYOUT: str = os.getenv('LOCAL_STORAGE_LAYOUT', 'sharded')
+    # 'sendfile' (served by the app itself), or 'x-accel' (nginx) / 'x-sendfile' (Apache/lighttpd) behind a proxy
+    LOCAL_SERVE_MODE: str = os.getenv('LOCAL_SERVE_MODE', 'sendfile')
+    LOCAL_ACCEL_REDIRECT_PREFIX: str = os.getenv('LOCAL_ACCEL_REDIRECT_PREFIX', '/protected-uploads')
+    # At-rest compression of text-like uploads: 'off', 'gzip' or 'zstd'
+    LOCAL_COMPRESSION: str = os.getenv('LOCAL_COMPRESSION', 'off')
+    LOCAL_COMPRESSION_LEVEL: int = int(os.getenv('LOCAL_COMPRESSION_LEVEL', '6'))
+    ALGORITHM: str = os.getenv('ALGORITHM', 'HS256')
 
     # Email configuration
     SMTP_SERVER: str = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
@@ -25,9 +35,114 @@ class Settings:
     SMTP_PASSWORD: str = os.getenv('SMTP_PASSWORD', '')
     FROM_EMAIL: str = os.getenv('FROM_EMAIL', 'noreply@atcdrive.com')
 
+    # Blob scrubber (0 disables the in-process background scrubber)
+    SCRUB_INTERVAL_HOURS: float = float(os.getenv('SCRUB_INTERVAL_HOURS', '0'))
+    SCRUB_RATE_MB_PER_SEC: float = float(os.getenv('SCRUB_RATE_MB_PER_SEC', '20'))
+
+    # File version retention: at most N versions per file (0 = unlimited), and
+    # older versions expire after N days (0 = never). The current version is always kept.
+    FILE_VERSIONS_KEEP: int = int(os.getenv('FILE_VERSIONS_KEEP', '20'))
+    FILE_VERSIONS_KEEP_DAYS: int = int(os.getenv('FILE_VERSIONS_KEEP_DAYS', '0'))
+
+    # Storage reconciler: rows per key batch, and how old an unreferenced blob must be to count as orphaned
+    RECONCILE_BATCH_SIZE: int = int(os.getenv('RECONCILE_BATCH_SIZE', '1000'))
+    RECONCILE_MIN_AGE_HOURS: float = float(os.getenv('RECONCILE_MIN_AGE_HOURS', '24'))
+
+    # Trash: deleted items are purged this long after deletion (interval 0 disables the in-process purger)
+    TRASH_RETENTION_DAYS: int = int(os.getenv('TRASH_RETENTION_DAYS', '30'))
+    TRASH_PURGE_INTERVAL_MINUTES: int = int(os.getenv('TRASH_PURGE_INTERVAL_MINUTES', '60'))
+    TRASH_PURGE_BATCH_SIZE: int = int(os.getenv('TRASH_PURGE_BATCH_SIZE', '1000'))
+
+    # Directory uploads: how many blobs are written to storage at once per request
+    UPLOAD_CONCURRENCY: int = int(os.getenv('UPLOAD_CONCURRENCY', '8'))
+
+    # Server-side copies: subtrees with more files than this run as a background job
+    COPY_INLINE_MAX_FILES: int = int(os.getenv('COPY_INLINE_MAX_FILES', '500'))
+    COPY_BATCH_SIZE: int = int(os.getenv('COPY_BATCH_SIZE', '1000'))
+
+    # Media metadata extraction after upload (0 workers disables it)
+    METADATA_WORKERS: int = int(os.getenv('METADATA_WORKERS', '2'))
+
+    # Public share links: lifetime limits, how long link state is cached per worker,
+    # how often download counts are written, and how long a password unlock lasts
+    SHARE_LINK_DEFAULT_HOURS: int = int(os.getenv('SHARE_LINK_DEFAULT_HOURS', '168'))
+    SHARE_LINK_MAX_HOURS: int = int(os.getenv('SHARE_LINK_MAX_HOURS', '720'))
+    SHARE_STATE_TTL_SECONDS: float = float(os.getenv('SHARE_STATE_TTL_SECONDS', '30'))
+    SHARE_COUNTER_FLUSH_SECONDS: float = float(os.getenv('SHARE_COUNTER_FLUSH_SECONDS', '10'))
+    SHARE_UNLOCK_MINUTES: int = int(os.getenv('SHARE_UNLOCK_MINUTES', '60'))
+    # Password attempts per minute, per link and per client IP (0 = unlimited)
+    SHARE_UNLOCK_ATTEMPTS_PER_MINUTE: int = int(os.getenv('SHARE_UNLOCK_ATTEMPTS_PER_MINUTE', '10'))
+
+    # Folder/file listing cache (TTL 0 disables it)
+    LISTING_CACHE_MAX_ENTRIES: int = int(os.getenv('LISTING_CACHE_MAX_ENTRIES', '10000'))
+    LISTING_CACHE_TTL_SECONDS: int = int(os.getenv('LISTING_CACHE_TTL_SECONDS', '60'))
+
+    # Push notifications: 'local' (single process) or 'redis' (cross-worker)
+    EVENTS_BACKEND: str = os.getenv('EVENTS_BACKEND', 'local')
+    EVENTS_QUEUE_SIZE: int = int(os.getenv('EVENTS_QUEUE_SIZE', '256'))
+    REDIS_URL: str = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    # Rate limiting and bandwidth shaping, per role as "admin=..,editor=..,viewer=.." (0 = unlimited).
+    # The store is 'memory' (per worker) or 'redis' (shared through REDIS_URL).
+    RATE_LIMIT_ENABLED: bool = os.getenv('RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+    RATE_LIMIT_STORE: str = os.getenv('RATE_LIMIT_STORE', 'memory')
+    RATE_LIMIT_REQUESTS_PER_SEC: str = os.getenv('RATE_LIMIT_REQUESTS_PER_SEC', 'admin=0,editor=20,viewer=10')
+    RATE_LIMIT_BURST: str = os.getenv('RATE_LIMIT_BURST', 'admin=0,editor=60,viewer=30')
+    RATE_LIMIT_BYTES_PER_SEC: str = os.getenv('RATE_LIMIT_BYTES_PER_SEC', 'admin=0,editor=52428800,viewer=20971520')
+
+    # Password hashing pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '64'))
+
+    # Serving: worker processes (0 = one per CPU), state shared between them ('memory' or 'redis'),
+    # and how long a stopping worker waits for in-flight uploads and downloads
+    WEB_CONCURRENCY: int = int(os.getenv('WEB_CONCURRENCY', '0'))
+    SHARED_STATE_BACKEND: str = os.getenv('SHARED_STATE_BACKEND', 'memory')
+    DRAIN_TIMEOUT_SECONDS: float = float(os.getenv('DRAIN_TIMEOUT_SECONDS', '60'))
+
+    # Database pool per worker. DB_MAX_CONNECTIONS is the budget for all workers together and,
+    # when set, sizes each worker's pool; DB_POOL_SIZE / DB_MAX_OVERFLOW override it.
+    DB_MAX_CONNECTIONS: int = int(os.getenv('DB_MAX_CONNECTIONS', '0'))
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', '0'))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '-1'))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800'))
+
+    # SQL profiling (opt-in, adds X-SQL-Profile header and logs N+1 / slow queries)
+    SQL_PROFILING: bool = os.getenv('SQL_PROFILING', 'false').lower() == 'true'
+    SQL_SLOW_QUERY_MS: float = float(os.getenv('SQL_SLOW_QUERY_MS', '200'))
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(',')]
 
+    @property
+    def worker_count(self) -> int:
+        return self.WEB_CONCURRENCY or os.cpu_count() or 1
+
+    @property
+    def db_pool_limits(self) -> Tuple[int, int]:
+        # (pool_size, max_overflow) for one worker; SQLAlchemy's 5 + 10 unless configured
+        if self.DB_MAX_CONNECTIONS:
+            per_worker = max(2, self.DB_MAX_CONNECTIONS // self.worker_count)
+            pool_size, max_overflow = max(1, per_worker // 2), per_worker - max(1, per_worker // 2)
+        else:
+            pool_size, max_overflow = 5, 10
+        if self.DB_POOL_SIZE:
+            pool_size = self.DB_POOL_SIZE
+        if self.DB_MAX_OVERFLOW >= 0:
+            max_overflow = self.DB_MAX_OVERFLOW
+        return pool_size, max_overflow
+
+    @staticmethod
+    def role_tiers(value: str) -> Dict[str, float]:
+        # "admin=0,editor=20" -> {"admin": 0.0, "editor": 20.0}
+        tiers = {}
+        for part in value.split(','):
+            role, _, amount = part.partition('=')
+            if role.strip():
+                tiers[role.strip()] = float(amount or 0)
+        return tiers
+
 
 settings = Settings()
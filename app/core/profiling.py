@@ -0,0 +1,106 @@
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql_profile")
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class RequestProfile:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[statement_shape(statement)].append(elapsed_ms)
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        # The same SELECT shape issued many times in one request is the N+1 signature
+        return {
+            shape: len(timings)
+            for shape, timings in self.shapes.items()
+            if len(timings) >= threshold and shape.lstrip().upper().startswith("SELECT")
+        }
+
+    def summary(self) -> str:
+        n_plus_one = self.repeated_shapes(settings.SQL_N_PLUS_ONE_THRESHOLD)
+        return f"queries={self.count};time={self.total_ms:.1f}ms;shapes={len(self.shapes)};n+1={len(n_plus_one)}"
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+@contextmanager
+def profile_sql():
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def statement_shape(statement: str) -> str:
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None or not conn.info.get("query_start"):
+        return
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    profile.record(statement, elapsed_ms)
+
+    if elapsed_ms >= settings.SQL_SLOW_QUERY_MS:
+        plan = _explain(conn, statement, parameters) if statement.lstrip().upper().startswith("SELECT") else ""
+        logger.warning(
+            "Slow query (%.1fms): %s\nParameters: %r\nPlan:\n%s", elapsed_ms, statement, parameters, plan
+        )
+
+
+class SQLProfilingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        with profile_sql() as profile:
+            response = await call_next(request)
+
+        summary = profile.summary()
+        response.headers["X-SQL-Profile"] = summary
+        logger.info("%s %s %s", request.method, request.url.path, summary)
+        for shape, count in profile.repeated_shapes(settings.SQL_N_PLUS_ONE_THRESHOLD).items():
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.url.path, count, shape)
+        return response
@@ -0,0 +1,193 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from jose import JWTError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import decode_token
+from app.core.shared_state import get_redis
+
+
+class MemoryStore:
+    """Token buckets held in this process.
+
+    Limits apply per worker, so with N workers a user effectively gets N
+    times the configured rate; use the redis store to share buckets.
+    """
+
+    blocking = False
+
+    def __init__(self, max_buckets: int = 100_000):
+        self.max_buckets = max_buckets
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float, debt: bool) -> float:
+        """Consume `cost` tokens and return how many seconds the caller should wait.
+
+        With debt=False nothing is consumed when the bucket is short, and the
+        return value is the time until it would have enough. With debt=True
+        the tokens are always taken and the wait pays the balance back.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < cost and not debt:
+                self._buckets[key] = (tokens, now)
+                return (cost - tokens) / rate
+            tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def _prune(self, now: float):
+        # Idle long enough to be full again: dropping the bucket changes nothing
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if now - updated < 60
+        }
+
+
+# KEYS[1] bucket; ARGV rate, burst, cost, now, debt. Returns the wait in seconds.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < cost and ARGV[5] == '0' then
+  wait = (cost - tokens) / rate
+else
+  tokens = tokens - cost
+  if tokens < 0 then wait = -tokens / rate end
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    """Token buckets shared by every worker, updated atomically by a Lua script."""
+
+    blocking = True
+    KEY_PREFIX = "atc-drive:ratelimit:"
+
+    def __init__(self, client):
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    def take(self, key: str, rate: float, burst: float, cost: float, debt: bool) -> float:
+        return float(self._script(keys=[self.KEY_PREFIX + key], args=[rate, burst, cost, time.time(), int(debt)]))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RedisStore(get_redis()) if settings.RATE_LIMIT_STORE == "redis" else MemoryStore()
+    return _store
+
+
+def _role_name(role) -> str:
+    return getattr(role, "value", role) or "viewer"
+
+
+def request_limit(role) -> Tuple[float, float]:
+    # (requests per second, burst) for the role; a rate of 0 means unlimited
+    name = _role_name(role)
+    rate = settings.role_tiers(settings.RATE_LIMIT_REQUESTS_PER_SEC).get(name, 0.0)
+    burst = settings.role_tiers(settings.RATE_LIMIT_BURST).get(name, 0.0)
+    return rate, max(burst, rate, 1.0)
+
+
+def bandwidth_limit(role) -> float:
+    return settings.role_tiers(settings.RATE_LIMIT_BYTES_PER_SEC).get(_role_name(role), 0.0)
+
+
+async def take(key: str, rate: float, burst: float, cost: float = 1, debt: bool = False) -> float:
+    store = get_store()
+    if store.blocking:
+        return await run_in_threadpool(store.take, key, rate, burst, cost, debt)
+    return store.take(key, rate, burst, cost, debt)
+
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+def _token_identity(scope: Scope) -> Optional[Tuple[str, str]]:
+    # (user key, role) from the signed claims; invalid tokens are left for the auth dependency to reject
+    headers = dict(scope.get("headers") or [])
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        payload = decode_token(auth[7:])
+    except JWTError:
+        return None
+    user = payload.get("uid", payload.get("sub"))
+    if user is None:
+        return None
+    return str(user), payload.get("role", "viewer")
+
+
+class BandwidthMiddleware:
+    """Shapes request and response bodies to the user's bytes-per-second tier.
+
+    Uploads are slowed where the body is received, so TCP backpressure reaches
+    the client instead of the server buffering the excess. Downloads are slowed
+    per body chunk; zero-copy sendfile is withheld from limited users so their
+    downloads go through the chunked path, and nginx offloads get
+    X-Accel-Limit-Rate. Presigned S3 downloads bypass the app and aren't shaped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        identity = _token_identity(scope) if scope["type"] == "http" else None
+        limit = bandwidth_limit(identity[1]) if identity else 0.0
+        if not limit:
+            return await self.app(scope, receive, send)
+
+        user_key = identity[0]
+        burst = limit  # one second's worth
+
+        async def shaped_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and message.get("body"):
+                wait = await take(f"bw-up:{user_key}", limit, burst, len(message["body"]), debt=True)
+                if wait:
+                    await asyncio.sleep(wait)
+            return message
+
+        async def shaped_send(message: Message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if any(name.lower() == b"x-accel-redirect" for name, _ in headers):
+                    headers.append((b"x-accel-limit-rate", str(int(limit)).encode()))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and message.get("body"):
+                wait = await take(f"bw-down:{user_key}", limit, burst, len(message["body"]), debt=True)
+                if wait:
+                    await asyncio.sleep(wait)
+            await send(message)
+
+        extensions = {k: v for k, v in (scope.get("extensions") or {}).items() if k != "http.response.zerocopy"}
+        await self.app({**scope, "extensions": extensions}, shaped_receive, shaped_send)
@@ -1,7 +1,12 @@
+import asyncio
+import secrets
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
 from .config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -10,6 +15,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token")
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
 
 def verify_password(plain_password, hashed_password):
@@ -18,9 +24,66 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt is CPU-bound; running it in a dedicated process pool keeps login bursts
+# from occupying the threadpool that serves file traffic.
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_pending_hash_jobs = 0
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_pool
+
+async def _run_hash_job(fn, *args):
+    global _pending_hash_jobs
+    if _pending_hash_jobs >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent authentication requests",
+            headers={"Retry-After": "1"},
+        )
+    _pending_hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_hash_pool(), fn, *args)
+    finally:
+        _pending_hash_jobs -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_hash_job(get_password_hash, password)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.setdefault("type", "access")
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt
+
+def create_user_tokens(user, token_version: int) -> dict:
+    # Access tokens carry role/is_active so authenticated requests can skip the user query;
+    # they are short-lived and checked against the token version cache for revocation.
+    claims = {"sub": user.username, "uid": user.id, "ver": token_version}
+    access_token = create_access_token({
+        **claims,
+        "role": user.role.value if user.role else None,
+        "active": bool(user.is_active),
+    })
+    refresh_token = create_access_token(
+        {**claims, "type": "refresh", "jti": secrets.token_urlsafe(16)},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+def decode_token(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]) 
\ No newline at end of file
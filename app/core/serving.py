@@ -0,0 +1,50 @@
+"""Running the app as several worker processes under gunicorn.
+
+gunicorn.conf.py at the repository root loads the app once in the master
+(preload_app) and forks settings.worker_count workers from it. Anything
+holding sockets that the master may have opened while importing the app
+(the database pool, redis and S3 clients) is dropped in each worker right
+after the fork, and every worker opens its own.
+
+A stopping worker closes its listening sockets and idle keep-alive
+connections, lets in-flight requests (uploads and downloads included) finish
+for up to DRAIN_TIMEOUT_SECONDS, cancels whatever is left, and only then runs
+the shutdown handlers, so download counts are flushed after the last download.
+"""
+import logging
+
+from uvicorn.workers import UvicornWorker
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "timeout_graceful_shutdown": int(settings.DRAIN_TIMEOUT_SECONDS),
+    }
+
+
+def reset_after_fork():
+    from app.core import rate_limit, shared_state
+    from app.db.session import dispose_engine_after_fork
+    from app.services import s3
+
+    dispose_engine_after_fork()
+    shared_state.reset_after_fork()
+    rate_limit._store = None
+    s3._client = None
+
+
+def warn_on_single_process_state():
+    if settings.worker_count <= 1:
+        return
+    if settings.EVENTS_BACKEND != "redis":
+        logger.warning("EVENTS_BACKEND=%s: live folder updates only reach clients on the same worker", settings.EVENTS_BACKEND)
+    if settings.SHARED_STATE_BACKEND != "redis":
+        logger.warning("SHARED_STATE_BACKEND=%s: periodic jobs will run in every worker", settings.SHARED_STATE_BACKEND)
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_STORE != "redis":
+        logger.warning("RATE_LIMIT_STORE=%s: each worker enforces its own rate limits", settings.RATE_LIMIT_STORE)
@@ -0,0 +1,71 @@
+"""State shared by every worker process.
+
+With one worker the in-memory backend is enough; with several, set
+SHARED_STATE_BACKEND=redis so all of them see the same state. It holds
+leases: claim() succeeds for one caller until the TTL runs out, so periodic
+jobs run in one worker rather than in all of them.
+"""
+import os
+import threading
+import time
+from typing import Dict
+
+from app.core.config import settings
+
+_redis = None
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    # One client (and connection pool) per worker process, shared by events, rate limiting and shared state
+    global _redis
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                import redis
+                _redis = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+class MemorySharedState:
+    def __init__(self):
+        self._leases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._leases.get(key, 0) > now:
+                return False
+            self._leases[key] = now + ttl
+            return True
+
+
+class RedisSharedState:
+    KEY_PREFIX = "atc-drive:state:"
+
+    def __init__(self, client):
+        self._redis = client
+
+    def claim(self, key: str, ttl: float) -> bool:
+        return bool(self._redis.set(self.KEY_PREFIX + key, os.getpid(), nx=True, px=int(ttl * 1000)))
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state():
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = RedisSharedState(get_redis()) if settings.SHARED_STATE_BACKEND == "redis" else MemorySharedState()
+    return _state
+
+
+def reset_after_fork():
+    # Clients inherited from a preloading parent must not be shared with it
+    global _redis, _state
+    _redis = None
+    _state = None
@@ -1,3 +1,9 @@
 from .user import *
 from .folder import *
-from .file import * 
\ No newline at end of file
+from .file import *
+from .token import *
+from .change import *
+from .trash import *
+from .job import *
+from .media import *
+from .share import *
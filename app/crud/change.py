@@ -0,0 +1,106 @@
+from sqlalchemy import event, func, select, or_, text
+from sqlalchemy.orm import Session
+from app.models.change import ChangeEvent
+from app.models.folder_permissions import FolderPermission
+from app.services.events import broker, ROOT_CHANNEL
+from typing import Iterable, List, Optional
+
+# Any constant works as long as every writer of change_log takes the same one
+CHANGE_LOG_LOCK = 0x6368616E6765
+
+def lock_change_log(db: Session):
+    # Ids come from a sequence at insert time, so two writers could commit out of
+    # id order and a reader would move its cursor past an id that commits later.
+    # Holding this lock from the first change insert until commit keeps ids in
+    # commit order. SQLite serializes writers on its own.
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    if db.in_transaction() and db.info.get("change_log_locked") is db.get_transaction():
+        return
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK})
+    db.info["change_log_locked"] = db.get_transaction()
+
+def record_change(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    action: str,
+    folder_id: Optional[int] = None,
+    name: Optional[str] = None,
+    old_folder_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    notify: Iterable[Optional[int]] = (),
+):
+    # Added to the caller's session so the event commits (or rolls back) with the change itself.
+    # Subscribers of folder_id, old_folder_id and any `notify` folders are pushed the event after commit.
+    lock_change_log(db)
+    change = ChangeEvent(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        folder_id=folder_id,
+        name=name,
+        old_folder_id=old_folder_id,
+        user_id=user_id,
+    )
+    db.add(change)
+    db.info.setdefault("pending_changes", []).append((change, tuple(notify)))
+
+def notify_folders(db: Session, folder_ids: Iterable[Optional[int]], message: dict):
+    # For set-based writes that log changes without ORM objects
+    db.info.setdefault("pending_events", []).append(({_channel(f) for f in folder_ids}, message))
+
+def _channel(folder_id: Optional[int]) -> int:
+    # Top-level items (no folder / no parent) are published on the root channel
+    return ROOT_CHANNEL if folder_id is None else folder_id
+
+def change_message(change: ChangeEvent) -> dict:
+    return {
+        "id": change.id,
+        "entity_type": change.entity_type,
+        "entity_id": change.entity_id,
+        "action": change.action,
+        "folder_id": change.folder_id,
+        "old_folder_id": change.old_folder_id,
+        "user_id": change.user_id,
+        "name": change.name,
+    }
+
+@event.listens_for(Session, "after_flush")
+def _collect_change_events(session, flush_context):
+    # Ids are assigned by now; serialize while the objects are still loaded
+    pending = session.info.pop("pending_changes", [])
+    events = session.info.setdefault("pending_events", [])
+    for change, notify in pending:
+        folder_ids = {_channel(f) for f in (change.folder_id, *notify)}
+        if change.old_folder_id is not None:
+            folder_ids.add(change.old_folder_id)
+        events.append((folder_ids, change_message(change)))
+
+@event.listens_for(Session, "after_commit")
+def _publish_change_events(session):
+    for folder_ids, message in session.info.pop("pending_events", []):
+        for folder_id in folder_ids:
+            broker.publish(folder_id, message)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_change_events(session):
+    session.info.pop("pending_changes", None)
+    session.info.pop("pending_events", None)
+
+def get_latest_change_id(db: Session) -> int:
+    # Safe as a cursor: with lock_change_log, no lower id can still be uncommitted
+    return db.query(func.max(ChangeEvent.id)).scalar() or 0
+
+def get_changes_since(db: Session, since: int, until: int, user_id: Optional[int] = None, limit: int = 500) -> List[ChangeEvent]:
+    query = db.query(ChangeEvent).filter(ChangeEvent.id > since, ChangeEvent.id <= until)
+
+    # user_id is None for admins, who see every change
+    if user_id is not None:
+        visible_folders = select(FolderPermission.folder_id).where(FolderPermission.user_id == user_id)
+        query = query.filter(or_(
+            ChangeEvent.folder_id.in_(visible_folders),
+            ChangeEvent.old_folder_id.in_(visible_folders),
+            ChangeEvent.user_id == user_id,
+        ))
+    return query.order_by(ChangeEvent.id).limit(limit).all()
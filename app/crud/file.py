@@ -1,32 +1,241 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, tuple_, union
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from typing import Iterable, List, Optional, Tuple
 from app.models.file import File
-from app.schemas.file import FileCreate, FileUpdate, FileMove
+from app.models.file_version import FileVersion
+from app.models.media_attributes import MediaAttributes
+from app.schemas.file import FileCreate, FileUpdate, FileMove, FileListFilters
+from app.crud.change import record_change
+from app.core.config import settings
 
-def create_file(db: Session, file: FileCreate, uploaded_by: int, storage_type: str = "local", storage_key: str = None):
+def create_file(db: Session, file: FileCreate, uploaded_by: int, storage_type: str = "local", storage_key: str = None, file_size: int = None, content_encoding: str = None, sha256: str = None):
     db_file = File(
         filename=file.filename,
         folder_id=file.folder_id,
         uploaded_by=uploaded_by,
         storage_type=storage_type,
-        storage_key=storage_key
+        storage_key=storage_key,
+        file_size=file_size,
+        content_encoding=content_encoding,
+        sha256=sha256,
+        version=1
     )
     db.add(db_file)
+    db.flush()
+    if storage_key:
+        db.add(_version_of(db_file, uploaded_by))
+    record_change(db, "file", db_file.id, "create", db_file.folder_id, db_file.filename)
     db.commit()
     db.refresh(db_file)
     return db_file
 
+def copy_file(db: Session, db_file: File, folder_id: int, filename: str, uploaded_by: int) -> File:
+    # The copy points at the same blob; blobs are only deleted once unreferenced, so nothing is duplicated.
+    # Locking the source stops a concurrent upload from retiring that blob before the copy commits.
+    db.refresh(db_file, with_for_update=True)
+    new_file = File(
+        filename=filename,
+        folder_id=folder_id,
+        uploaded_by=uploaded_by,
+        storage_type=db_file.storage_type,
+        storage_key=db_file.storage_key,
+        file_size=db_file.file_size,
+        content_encoding=db_file.content_encoding,
+        sha256=db_file.sha256,
+        version=1
+    )
+    db.add(new_file)
+    db.flush()
+    if new_file.storage_key:
+        db.add(_version_of(new_file, uploaded_by))
+    record_change(db, "file", new_file.id, "create", new_file.folder_id, new_file.filename)
+    db.commit()
+    db.refresh(new_file)
+    return new_file
+
 def get_file(db: Session, file_id: int):
-    return db.query(File).filter(File.id == file_id).first()
+    return db.query(File).filter(File.id == file_id, File.deleted_at.is_(None)).first()
+
+ATTRIBUTE_SORTS = {
+    "mime_type": MediaAttributes.mime_type,
+    "width": MediaAttributes.width,
+    "height": MediaAttributes.height,
+    "pages": MediaAttributes.page_count,
+    "duration": MediaAttributes.duration,
+}
+FILE_SORTS = {"name": File.filename, "created_at": File.created_at, "size": File.file_size}
+
+def list_folder_files(db: Session, folder_id: Optional[int], filters: FileListFilters) -> List[File]:
+    # Filters and sorts use the indexed attribute columns; the blobs are never read
+    query = db.query(File).filter(File.folder_id == folder_id, File.deleted_at.is_(None))
+    ranges = [
+        (MediaAttributes.width, filters.min_width, filters.max_width),
+        (MediaAttributes.height, filters.min_height, filters.max_height),
+        (MediaAttributes.page_count, filters.min_pages, filters.max_pages),
+        (MediaAttributes.duration, filters.min_duration, filters.max_duration),
+    ]
+    conditions = []
+    if filters.mime_type:
+        if filters.mime_type.endswith("/*"):
+            conditions.append(MediaAttributes.mime_type.startswith(filters.mime_type[:-1]))
+        else:
+            conditions.append(MediaAttributes.mime_type == filters.mime_type)
+    for column, low, high in ranges:
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column <= high)
+
+    if conditions or filters.sort in ATTRIBUTE_SORTS:
+        query = query.outerjoin(MediaAttributes, MediaAttributes.sha256 == File.sha256).filter(*conditions)
+        # Attributes come from the join; no second query per file
+        query = query.options(contains_eager(File.attributes))
+    else:
+        query = query.options(selectinload(File.attributes))
+
+    column = ATTRIBUTE_SORTS.get(filters.sort, FILE_SORTS.get(filters.sort, File.filename))
+    ordered = column.desc() if filters.order == "desc" else column.asc()
+    return query.order_by(ordered.nulls_last(), File.id).all()
+
+def get_file_by_name(db: Session, folder_id: int, filename: str) -> Optional[File]:
+    return db.query(File).filter(
+        File.folder_id == folder_id, File.filename == filename, File.deleted_at.is_(None)
+    ).order_by(File.id).first()
+
+def find_blob_by_digest(db: Session, storage_type: str, sha256: str) -> Optional[FileVersion]:
+    # Any stored blob with this content; new uploads and versions reuse it instead of storing a copy.
+    # The version row stays locked until the caller commits: retention and purges delete version
+    # rows before checking which blobs became unreferenced, so they wait and then see the new
+    # reference. SQLite can't lock rows, so there the upload keeps its own blob.
+    if not sha256 or db.get_bind().dialect.name == "sqlite":
+        return None
+    return db.query(FileVersion).filter(
+        FileVersion.sha256 == sha256, FileVersion.storage_type == storage_type
+    ).order_by(FileVersion.id).with_for_update().first()
+
+def _version_of(db_file: File, uploaded_by: int) -> FileVersion:
+    return FileVersion(
+        file_id=db_file.id,
+        version=db_file.version,
+        storage_type=db_file.storage_type,
+        storage_key=db_file.storage_key,
+        file_size=db_file.file_size,
+        content_encoding=db_file.content_encoding,
+        sha256=db_file.sha256,
+        uploaded_by=uploaded_by,
+    )
+
+def add_file_version(db: Session, db_file: File, uploaded_by: int, storage_type: str, storage_key: str, file_size: int = None, content_encoding: str = None, sha256: str = None) -> Tuple[File, List[Tuple[str, str]]]:
+    # Makes the given blob the file's current content. Returns the file and the
+    # (storage_type, storage_key) blobs that retention freed, for purge_blobs.
+    db_file.storage_type = storage_type
+    db_file.storage_key = storage_key
+    db_file.file_size = file_size
+    db_file.content_encoding = content_encoding
+    db_file.sha256 = sha256
+    db_file.version = (db_file.version or 0) + 1
+    db.add(_version_of(db_file, uploaded_by))
+    record_change(db, "file", db_file.id, "update", db_file.folder_id, db_file.filename)
+    expired = _apply_version_retention(db, db_file)
+    db.commit()
+    db.refresh(db_file)
+    return db_file, unreferenced_blobs(db, expired)
+
+def _apply_version_retention(db: Session, db_file: File) -> List[Tuple[str, str]]:
+    db.flush()
+    query = db.query(FileVersion).filter(FileVersion.file_id == db_file.id, FileVersion.version != db_file.version)
+    conditions = []
+    if settings.FILE_VERSIONS_KEEP > 0:
+        conditions.append(FileVersion.version <= db_file.version - settings.FILE_VERSIONS_KEEP)
+    if settings.FILE_VERSIONS_KEEP_DAYS > 0:
+        conditions.append(FileVersion.created_at < datetime.utcnow() - timedelta(days=settings.FILE_VERSIONS_KEEP_DAYS))
+    if not conditions:
+        return []
+    expired = query.filter(or_(*conditions)).all()
+    for version in expired:
+        db.delete(version)
+    return [(v.storage_type, v.storage_key) for v in expired]
+
+def get_file_versions(db: Session, file_id: int) -> List[FileVersion]:
+    return db.query(FileVersion).filter(FileVersion.file_id == file_id).order_by(FileVersion.version.desc()).all()
+
+def restore_file_version(db: Session, db_file: File, version: int, uploaded_by: int) -> Optional[Tuple[File, List[Tuple[str, str]]]]:
+    # Restoring appends a new version pointing at the old blob, so history stays linear and nothing is copied.
+    # Locked like find_blob_by_digest, so retention can't free the blob before the new version commits.
+    old = db.query(FileVersion).filter(
+        FileVersion.file_id == db_file.id, FileVersion.version == version
+    ).with_for_update().first()
+    if not old:
+        return None
+    return add_file_version(
+        db, db_file, uploaded_by, old.storage_type, old.storage_key, old.file_size, old.content_encoding, old.sha256
+    )
+
+def unreferenced_blobs(db: Session, blobs: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    # Blobs are shared between versions and files with equal content; only
+    # those no row points at any more are safe to delete
+    blobs = set(blobs)
+    if not blobs:
+        return []
+    referenced = set()
+    for model in (FileVersion, File):
+        key = tuple_(model.storage_type, model.storage_key)
+        referenced.update(
+            tuple(row) for row in db.query(model.storage_type, model.storage_key).filter(key.in_(list(blobs))).distinct()
+        )
+    return list(blobs - referenced)
+
+def _key_order(db: Session, column):
+    # Byte order, to line up with S3 listings and the sorted disk walk (PostgreSQL sorts by locale otherwise)
+    return column.collate("C") if db.get_bind().dialect.name == "postgresql" else column
+
+def referenced_storage_keys(db: Session, storage_type: str, after: str, limit: int) -> List[str]:
+    # The next `limit` distinct keys above `after` that any file or version points at, in byte order
+    keys = union(
+        select(File.storage_key.label("key")).where(File.storage_type == storage_type, File.storage_key.isnot(None)),
+        select(FileVersion.storage_key.label("key")).where(FileVersion.storage_type == storage_type),
+    ).subquery()
+    key = _key_order(db, keys.c.key)
+    return list(db.scalars(select(keys.c.key).where(key > after).order_by(key).limit(limit)))
+
+def delete_dangling_rows(db: Session, storage_type: str, keys: List[str]) -> Tuple[int, int, List[Tuple[str, str]]]:
+    # Removes files whose current blob is gone and versions pointing at missing blobs.
+    # Returns (files, versions, blobs) where blobs are other versions' blobs nothing references any more.
+    files = db.query(File.id, File.folder_id, File.filename, File.deleted_at).filter(
+        File.storage_type == storage_type, File.storage_key.in_(keys)
+    ).all()
+    file_ids = [f.id for f in files]
+    for f in files:
+        if f.deleted_at is None:
+            record_change(db, "file", f.id, "delete", f.folder_id, f.filename)
+    blobs = {
+        (row.storage_type, row.storage_key)
+        for row in db.query(FileVersion.storage_type, FileVersion.storage_key).filter(
+            FileVersion.file_id.in_(file_ids), FileVersion.storage_key.notin_(keys)
+        ).distinct()
+    }
+    versions = db.query(FileVersion).filter(
+        or_(FileVersion.file_id.in_(file_ids), (FileVersion.storage_type == storage_type) & FileVersion.storage_key.in_(keys))
+    ).delete(synchronize_session=False)
+    db.query(File).filter(File.id.in_(file_ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(file_ids), versions, unreferenced_blobs(db, blobs)
 
 def update_file(db: Session, file_id: int, file_update: FileUpdate):
     db_file = get_file(db, file_id)
     if not db_file:
         return None
     
+    old_name, old_folder_id = db_file.filename, db_file.folder_id
     update_data = file_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_file, field, value)
     
+    if db_file.filename != old_name:
+        record_change(db, "file", db_file.id, "rename", db_file.folder_id, db_file.filename)
+    if db_file.folder_id != old_folder_id:
+        record_change(db, "file", db_file.id, "move", db_file.folder_id, db_file.filename, old_folder_id=old_folder_id)
     db.commit()
     db.refresh(db_file)
     return db_file
@@ -36,16 +245,20 @@ def move_file(db: Session, file_id: int, new_folder_id: int):
     if not db_file:
         return None
     
+    old_folder_id = db_file.folder_id
     db_file.folder_id = new_folder_id
+    record_change(db, "file", db_file.id, "move", new_folder_id, db_file.filename, old_folder_id=old_folder_id)
     db.commit()
     db.refresh(db_file)
     return db_file
 
 def delete_file(db: Session, file_id: int):
+    # Moves the file to the trash; the purger removes the row and its blobs once it expires
     db_file = get_file(db, file_id)
     if not db_file:
         return False
     
-    db.delete(db_file)
+    record_change(db, "file", db_file.id, "delete", db_file.folder_id, db_file.filename)
+    db_file.deleted_at = datetime.utcnow()
     db.commit()
-    return True 
\ No newline at end of file
+    return True
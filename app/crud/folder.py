@@ -1,9 +1,16 @@
+from sqlalchemy import func, insert, literal, null, select
 from sqlalchemy.orm import Session
+from datetime import datetime
 from app.models.folder import Folder
 from app.models.folder_permissions import FolderPermission
-from app.schemas.folder import FolderCreate, FolderUpdate
-from app.models.user import RoleEnum
-from typing import List, Optional
+from app.schemas.folder import FolderCreate, FolderUpdate, FolderOut
+from app.models.user import RoleEnum, User
+from app.models.change import ChangeEvent
+from app.crud.change import lock_change_log, record_change, notify_folders
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Columns needed by FolderOut; read paths select only these instead of full ORM rows
+FOLDER_OUT_COLUMNS = (Folder.id, Folder.name, Folder.parent_id, Folder.owner_id)
 
 def create_folder(db: Session, folder: FolderCreate, owner_id: int) -> Folder:
     db_folder = Folder(
@@ -12,15 +19,17 @@ def create_folder(db: Session, folder: FolderCreate, owner_id: int) -> Folder:
         owner_id=owner_id
     )
     db.add(db_folder)
+    db.flush()
+    record_change(db, "folder", db_folder.id, "create", db_folder.id, db_folder.name, notify=[db_folder.parent_id])
     db.commit()
     db.refresh(db_folder)
     return db_folder
 
 def get_folder(db: Session, folder_id: int) -> Optional[Folder]:
-    return db.query(Folder).filter(Folder.id == folder_id).first()
+    return db.query(Folder).filter(Folder.id == folder_id, Folder.deleted_at.is_(None)).first()
 
 def get_folders(db: Session, parent_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[Folder]:
-    query = db.query(Folder)
+    query = db.query(Folder).filter(Folder.deleted_at.is_(None))
     if parent_id is not None:
         query = query.filter(Folder.parent_id == parent_id)
     else:
@@ -32,30 +41,248 @@ def update_folder(db: Session, folder_id: int, folder_update: FolderUpdate) -> O
     if not db_folder:
         return None
     
+    old_name = db_folder.name
     update_data = folder_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_folder, field, value)
     
+    if db_folder.name != old_name:
+        record_change(db, "folder", db_folder.id, "rename", db_folder.id, db_folder.name, notify=[db_folder.parent_id])
     db.commit()
     db.refresh(db_folder)
     return db_folder
 
 def delete_folder(db: Session, folder_id: int) -> bool:
+    # Moves an empty folder to the trash
     db_folder = get_folder(db, folder_id)
     if not db_folder:
         return False
     
     from app.models.file import File
-    has_files = db.query(File).filter(File.folder_id == folder_id).count() > 0
-    has_subfolders = db.query(Folder).filter(Folder.parent_id == folder_id).count() > 0
+    has_files = db.query(db.query(File.id).filter(File.folder_id == folder_id, File.deleted_at.is_(None)).exists()).scalar()
+    has_subfolders = db.query(db.query(Folder.id).filter(Folder.parent_id == folder_id, Folder.deleted_at.is_(None)).exists()).scalar()
     
     if has_files or has_subfolders:
         raise ValueError("Cannot delete folder with files or subfolders")
     
-    db.delete(db_folder)
+    record_change(db, "folder", folder_id, "delete", folder_id, db_folder.name, notify=[db_folder.parent_id])
+    db_folder.deleted_at = datetime.utcnow()
     db.commit()
     return True
 
+def delete_folder_tree(db: Session, folder_id: int) -> int:
+    # Moves the whole subtree to the trash with a fixed number of set-based
+    # UPDATEs, stamping every row with the same deleted_at so it can be
+    # restored as a unit. Returns the number of files trashed.
+    from app.models.file import File
+    now = datetime.utcnow()
+    subtree_ids = subtree_folder_ids(folder_id, deleted_at=None)
+
+    root = db.query(Folder.name, Folder.parent_id).filter(Folder.id == folder_id).first()
+    if root:
+        notify_folders(db, [folder_id, root.parent_id], {
+            "entity_type": "folder", "entity_id": folder_id, "action": "delete", "folder_id": folder_id, "name": root.name,
+            "subtree": True,
+        })
+    record_tree_changes(db, subtree_ids, "delete", deleted_at=None)
+    # Files first: the subtree CTE only follows folders that are still live
+    files_trashed = db.query(File).filter(
+        File.folder_id.in_(subtree_ids), File.deleted_at.is_(None)
+    ).update({File.deleted_at: now}, synchronize_session=False)
+    db.query(Folder).filter(Folder.id.in_(subtree_ids)).update({Folder.deleted_at: now}, synchronize_session=False)
+    db.commit()
+    return files_trashed
+
+def subtree_folder_ids(folder_id: int, deleted_at: Optional[datetime]):
+    # Recursive CTE over the descendants sharing the root's deleted_at (None for live folders)
+    tree = select(Folder.id).where(Folder.id == folder_id).cte(name="folder_tree", recursive=True)
+    tree = tree.union_all(select(Folder.id).where(Folder.parent_id == tree.c.id, Folder.deleted_at == deleted_at))
+    return select(tree.c.id)
+
+def create_folder_paths(db: Session, root_id: int, paths: Iterable[str], owner_id: int) -> Dict[str, int]:
+    # Resolves relative directory paths ("a/b") under root_id to folder ids,
+    # reusing live folders with the same name and creating the rest with one
+    # bulk INSERT per depth. New folders get their parent's permissions plus
+    # editor for the uploader. Returns {path: folder_id}, with "" as the root.
+    ids = {"": root_id}
+    prefixes = {"/".join(parts[:i]) for parts in (p.split("/") for p in paths if p) for i in range(1, len(parts) + 1)}
+    changes = []
+    for depth in sorted({prefix.count("/") for prefix in prefixes}):
+        level = sorted(prefix for prefix in prefixes if prefix.count("/") == depth)
+        parent_of = {prefix: ids[prefix.rpartition("/")[0]] for prefix in level}
+        name_of = {prefix: prefix.rpartition("/")[2] for prefix in level}
+
+        existing = {}
+        for row in db.query(Folder.id, Folder.parent_id, Folder.name).filter(
+            Folder.parent_id.in_(set(parent_of.values())),
+            Folder.name.in_(set(name_of.values())),
+            Folder.deleted_at.is_(None),
+        ).order_by(Folder.id):
+            existing.setdefault((row.parent_id, row.name), row.id)
+        missing = []
+        for prefix in level:
+            if (parent_of[prefix], name_of[prefix]) in existing:
+                ids[prefix] = existing[(parent_of[prefix], name_of[prefix])]
+            else:
+                missing.append(prefix)
+        if not missing:
+            continue
+
+        new_ids = db.scalars(insert(Folder).returning(Folder.id, sort_by_parameter_order=True), [
+            {"name": name_of[prefix], "parent_id": parent_of[prefix], "owner_id": owner_id} for prefix in missing
+        ]).all()
+        ids.update(zip(missing, new_ids))
+
+        parent_permissions = {}
+        for row in db.query(FolderPermission.folder_id, FolderPermission.user_id, FolderPermission.permission).filter(
+            FolderPermission.folder_id.in_({parent_of[prefix] for prefix in missing})
+        ):
+            parent_permissions.setdefault(row.folder_id, {})[row.user_id] = row.permission
+        permissions = []
+        for prefix in missing:
+            inherited = dict(parent_permissions.get(parent_of[prefix], {}))
+            inherited[owner_id] = RoleEnum.editor
+            permissions.extend(
+                {"folder_id": ids[prefix], "user_id": user_id, "permission": permission}
+                for user_id, permission in inherited.items()
+            )
+        db.execute(insert(FolderPermission), permissions)
+
+        for prefix in missing:
+            changes.append({
+                "entity_type": "folder", "entity_id": ids[prefix], "action": "create", "folder_id": ids[prefix], "name": name_of[prefix],
+            })
+            notify_folders(db, [ids[prefix], parent_of[prefix]], changes[-1])
+
+    if changes:
+        lock_change_log(db)
+        db.execute(insert(ChangeEvent), changes)
+    db.commit()
+    return ids
+
+def is_in_subtree(db: Session, folder_id: int, candidate_id: int) -> bool:
+    subtree_ids = subtree_folder_ids(folder_id, deleted_at=None)
+    return db.query(db.query(Folder.id).filter(Folder.id == candidate_id, Folder.id.in_(subtree_ids)).exists()).scalar()
+
+def count_subtree_files(db: Session, folder_id: int) -> int:
+    from app.models.file import File
+    subtree_ids = subtree_folder_ids(folder_id, deleted_at=None)
+    return db.query(func.count(File.id)).filter(File.folder_id.in_(subtree_ids), File.deleted_at.is_(None)).scalar()
+
+def copy_folder_tree(
+    db: Session,
+    folder_id: int,
+    parent_id: Optional[int],
+    owner_id: int,
+    name: Optional[str] = None,
+    batch_size: int = 1000,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Folder:
+    # Copies the live subtree one level at a time with bulk INSERT ... RETURNING.
+    # Files share their source blobs (blobs are reference-counted), so no content
+    # is copied. Runs in one transaction; on_progress gets the running file count.
+    from app.models.file import File
+    from app.models.file_version import FileVersion
+    source = get_folder(db, folder_id)
+    root = Folder(name=name or source.name, parent_id=parent_id, owner_id=owner_id)
+    db.add(root)
+    db.flush()
+    notify_folders(db, [root.id, parent_id], {
+        "entity_type": "folder", "entity_id": root.id, "action": "create", "folder_id": root.id, "name": root.name,
+    })
+    changes = [{"entity_type": "folder", "entity_id": root.id, "action": "create", "folder_id": root.id, "name": root.name}]
+
+    new_ids = {source.id: root.id}
+    level = [source.id]
+    copied = 0
+    while level:
+        # Sharing carries over to the copies, and the copier can always edit them
+        permissions = {
+            (new_ids[row.folder_id], row.user_id): row.permission
+            for row in db.query(FolderPermission.folder_id, FolderPermission.user_id, FolderPermission.permission).filter(
+                FolderPermission.folder_id.in_(level)
+            )
+        }
+        permissions.update({(new_ids[old_id], owner_id): RoleEnum.editor for old_id in level})
+        db.execute(insert(FolderPermission), [
+            {"folder_id": f, "user_id": u, "permission": p} for (f, u), p in permissions.items()
+        ])
+
+        last_id = 0
+        while True:
+            rows = db.query(
+                File.id, File.filename, File.folder_id, File.storage_type, File.storage_key,
+                File.file_size, File.content_encoding, File.sha256,
+            ).filter(
+                File.folder_id.in_(level), File.deleted_at.is_(None), File.id > last_id
+            ).order_by(File.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            file_ids = db.scalars(insert(File).returning(File.id, sort_by_parameter_order=True), [{
+                "filename": r.filename, "folder_id": new_ids[r.folder_id], "uploaded_by": owner_id,
+                "storage_type": r.storage_type, "storage_key": r.storage_key, "file_size": r.file_size,
+                "content_encoding": r.content_encoding, "sha256": r.sha256, "version": 1,
+            } for r in rows]).all()
+            versions = [{
+                "file_id": file_id, "version": 1, "storage_type": r.storage_type or "s3", "storage_key": r.storage_key,
+                "file_size": r.file_size, "content_encoding": r.content_encoding, "sha256": r.sha256, "uploaded_by": owner_id,
+            } for file_id, r in zip(file_ids, rows) if r.storage_key]
+            if versions:
+                db.execute(insert(FileVersion), versions)
+            changes.extend({
+                "entity_type": "file", "entity_id": file_id, "action": "create", "folder_id": new_ids[r.folder_id], "name": r.filename,
+            } for file_id, r in zip(file_ids, rows))
+            copied += len(rows)
+            if on_progress:
+                on_progress(copied)
+
+        children = db.query(Folder.id, Folder.name, Folder.parent_id).filter(
+            Folder.parent_id.in_(level), Folder.deleted_at.is_(None)
+        ).order_by(Folder.id).all()
+        if not children:
+            break
+        child_ids = db.scalars(insert(Folder).returning(Folder.id, sort_by_parameter_order=True), [
+            {"name": c.name, "parent_id": new_ids[c.parent_id], "owner_id": owner_id} for c in children
+        ]).all()
+        new_ids.update(zip([c.id for c in children], child_ids))
+        changes.extend({
+            "entity_type": "folder", "entity_id": new_id, "action": "create", "folder_id": new_id, "name": c.name,
+        } for new_id, c in zip(child_ids, children))
+        level = [c.id for c in children]
+
+    lock_change_log(db)
+    db.execute(insert(ChangeEvent), changes)
+    db.commit()
+    db.refresh(root)
+    return root
+
+def record_tree_changes(db: Session, subtree_ids, action: str, deleted_at: Optional[datetime]):
+    # INSERT ... SELECT so the change log stays set-based like the update itself
+    from app.models.file import File
+    columns = ["entity_type", "entity_id", "action", "folder_id", "user_id", "name", "created_at"]
+    now = literal(datetime.utcnow())
+    lock_change_log(db)
+    db.execute(insert(ChangeEvent).from_select(columns, select(
+        literal("file"), File.id, literal(action), File.folder_id, null(), File.filename, now,
+    ).where(File.folder_id.in_(subtree_ids), File.deleted_at == deleted_at)))
+    db.execute(insert(ChangeEvent).from_select(columns, select(
+        literal("folder"), Folder.id, literal(action), Folder.id, null(), Folder.name, now,
+    ).where(Folder.id.in_(subtree_ids))))
+
+def grant_folder_permission(db: Session, folder_id: int, user_id: int, permission: RoleEnum) -> FolderPermission:
+    db_permission = FolderPermission(folder_id=folder_id, user_id=user_id, permission=permission)
+    db.add(db_permission)
+    db.flush()
+    record_change(db, "permission", db_permission.id, "grant", folder_id, user_id=user_id)
+    db.commit()
+    return db_permission
+
+def revoke_folder_permission(db: Session, db_permission: FolderPermission):
+    record_change(db, "permission", db_permission.id, "revoke", db_permission.folder_id, user_id=db_permission.user_id)
+    db.delete(db_permission)
+    db.commit()
+
 def get_folder_path(db: Session, folder_id: int) -> List[Folder]:
     path = []
     current_folder = get_folder(db, folder_id)
@@ -71,6 +298,43 @@ def get_folder_path(db: Session, folder_id: int) -> List[Folder]:
 
 def get_user_accessible_folders(db: Session, user_id: int, user_role: str) -> List[Folder]:
     if user_role == "admin":
-        return db.query(Folder).all()
+        return db.query(Folder).filter(Folder.deleted_at.is_(None)).all()
     
-    return db.query(Folder).join(FolderPermission).filter(FolderPermission.user_id == user_id).all()
\ No newline at end of file
+    return db.query(Folder).join(FolderPermission).filter(
+        FolderPermission.user_id == user_id, Folder.deleted_at.is_(None)
+    ).all()
+
+def rows_to_folder_out(rows) -> List[FolderOut]:
+    # Rows come straight from the DB with known types, so skip validation
+    return [FolderOut.model_construct(**row._mapping) for row in rows]
+
+def list_visible_folders(
+    db: Session, parent_id: Optional[int], user_id: Optional[int] = None, skip: int = 0, limit: Optional[int] = None
+) -> List[FolderOut]:
+    query = db.query(*FOLDER_OUT_COLUMNS).filter(Folder.deleted_at.is_(None))
+    if parent_id is not None:
+        query = query.filter(Folder.parent_id == parent_id)
+    else:
+        query = query.filter(Folder.parent_id.is_(None))
+
+    # user_id is None for admins, who see every folder
+    if user_id is not None:
+        query = query.join(FolderPermission, Folder.id == FolderPermission.folder_id).filter(
+            FolderPermission.user_id == user_id
+        )
+    if limit is not None:
+        # Stable order so pages don't overlap
+        query = query.order_by(Folder.id).offset(skip).limit(limit)
+    return rows_to_folder_out(query.all())
+
+def get_user_permission_folders(db: Session, user_id: int) -> List[FolderOut]:
+    rows = db.query(*FOLDER_OUT_COLUMNS).join(
+        FolderPermission, Folder.id == FolderPermission.folder_id
+    ).filter(FolderPermission.user_id == user_id, Folder.deleted_at.is_(None)).all()
+    return rows_to_folder_out(rows)
+
+def get_folder_permission_emails(db: Session, folder_id: int) -> List[str]:
+    rows = db.query(User.email).join(
+        FolderPermission, FolderPermission.user_id == User.id
+    ).filter(FolderPermission.folder_id == folder_id).all()
+    return [row.email for row in rows]
@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Session
+from app.models.job import Job
+from typing import Optional
+
+def create_job(db: Session, kind: str, user_id: int, total: int = 0) -> Job:
+    db_job = Job(kind=kind, user_id=user_id, total=total, status="pending")
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: int) -> Optional[Job]:
+    return db.query(Job).filter(Job.id == job_id).first()
+
+def update_job(db: Session, job_id: int, **values):
+    # Plain UPDATE so progress writes from a worker never load or lock more than the row
+    db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+    db.commit()
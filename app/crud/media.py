@@ -0,0 +1,35 @@
+from sqlalchemy.orm import Session
+from app.models.file import File
+from app.models.media_attributes import MediaAttributes
+from app.crud.change import record_change
+from typing import List, Optional, Tuple
+
+def get_media_attributes(db: Session, sha256: Optional[str]) -> Optional[MediaAttributes]:
+    if not sha256:
+        return None
+    return db.get(MediaAttributes, sha256)
+
+def save_media_attributes(db: Session, sha256: str, attrs: dict) -> MediaAttributes:
+    db_attrs = MediaAttributes(sha256=sha256, **attrs)
+    db.add(db_attrs)
+    # Listings include the attributes, so every live file with this content has changed
+    files = db.query(File.id, File.folder_id, File.filename).filter(File.sha256 == sha256, File.deleted_at.is_(None)).all()
+    for file_id, folder_id, filename in files:
+        record_change(db, "file", file_id, "update", folder_id, filename)
+    db.commit()
+    return db_attrs
+
+def files_missing_attributes(db: Session, after: str, limit: int) -> List[Tuple[str, str, str, Optional[str], Optional[int]]]:
+    # One (sha256, storage_type, storage_key, content_encoding, file_size) per content digest above `after`
+    rows = db.query(File.sha256, File.storage_type, File.storage_key, File.content_encoding, File.file_size).outerjoin(
+        MediaAttributes, MediaAttributes.sha256 == File.sha256
+    ).filter(
+        File.sha256 > after,
+        File.storage_key.isnot(None),
+        File.deleted_at.is_(None),
+        MediaAttributes.sha256.is_(None),
+    ).order_by(File.sha256).limit(limit).all()
+    unique = {}
+    for row in rows:
+        unique.setdefault(row[0], tuple(row))
+    return list(unique.values())
@@ -0,0 +1,57 @@
+from datetime import datetime
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from app.models.share_link import ShareLink
+from typing import Dict, List, Optional
+
+def create_share_link(
+    db: Session,
+    created_by: int,
+    expires_at: datetime,
+    file_id: Optional[int] = None,
+    folder_id: Optional[int] = None,
+    password_hash: Optional[str] = None,
+    max_downloads: Optional[int] = None,
+) -> ShareLink:
+    db_link = ShareLink(
+        file_id=file_id,
+        folder_id=folder_id,
+        created_by=created_by,
+        expires_at=expires_at,
+        password_hash=password_hash,
+        max_downloads=max_downloads,
+        download_count=0,
+    )
+    db.add(db_link)
+    db.commit()
+    db.refresh(db_link)
+    return db_link
+
+def get_share_link(db: Session, link_id: int) -> Optional[ShareLink]:
+    return db.query(ShareLink).filter(ShareLink.id == link_id).first()
+
+def list_share_links(db: Session, user_id: Optional[int] = None) -> List[ShareLink]:
+    # user_id None lists every link (admins)
+    query = db.query(ShareLink).filter(ShareLink.revoked_at.is_(None))
+    if user_id is not None:
+        query = query.filter(ShareLink.created_by == user_id)
+    return query.order_by(ShareLink.created_at.desc()).all()
+
+def revoke_share_link(db: Session, db_link: ShareLink) -> ShareLink:
+    db_link.revoked_at = datetime.utcnow()
+    db.commit()
+    db.refresh(db_link)
+    return db_link
+
+def add_download_counts(db: Session, counts: Dict[int, int]):
+    # One executemany for the whole batch; increments, so concurrent flushes from other workers add up
+    if not counts:
+        return
+    table = ShareLink.__table__
+    db.connection().execute(
+        update(table).where(table.c.id == bindparam("link_id")).values(
+            download_count=table.c.download_count + bindparam("delta")
+        ),
+        [{"link_id": link_id, "delta": delta} for link_id, delta in counts.items()],
+    )
+    db.commit()
@@ -0,0 +1,21 @@
+from sqlalchemy.orm import Session
+from app.models.token_version import UserTokenVersion
+from typing import Dict
+
+def get_token_version(db: Session, user_id: int) -> int:
+    row = db.query(UserTokenVersion.version).filter(UserTokenVersion.user_id == user_id).first()
+    return row.version if row else 0
+
+def get_token_versions(db: Session) -> Dict[int, int]:
+    return {row.user_id: row.version for row in db.query(UserTokenVersion.user_id, UserTokenVersion.version)}
+
+def bump_token_version(db: Session, user_id: int) -> int:
+    # Invalidates every access and refresh token issued to the user so far
+    db_version = db.query(UserTokenVersion).filter(UserTokenVersion.user_id == user_id).first()
+    if db_version:
+        db_version.version += 1
+    else:
+        db_version = UserTokenVersion(user_id=user_id, version=1)
+        db.add(db_version)
+    db.commit()
+    return db_version.version
@@ -0,0 +1,107 @@
+from datetime import datetime
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session, aliased
+from typing import List, Optional, Tuple
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.models.folder import Folder
+from app.models.folder_permissions import FolderPermission
+from app.crud.change import record_change, notify_folders
+from app.crud.file import unreferenced_blobs
+from app.crud.folder import subtree_folder_ids, record_tree_changes
+
+def list_trashed_files(db: Session, user_id: Optional[int] = None) -> List[File]:
+    # Files trashed on their own; ones inside a trashed folder are listed through that folder.
+    # user_id limits the listing to the caller's uploads (None for admins).
+    parent = aliased(Folder)
+    query = db.query(File).outerjoin(parent, File.folder_id == parent.id).filter(
+        File.deleted_at.isnot(None),
+        or_(parent.id.is_(None), parent.deleted_at.is_(None), parent.deleted_at != File.deleted_at),
+    )
+    if user_id is not None:
+        query = query.filter(File.uploaded_by == user_id)
+    return query.order_by(File.deleted_at.desc()).all()
+
+def list_trashed_folders(db: Session) -> List[Folder]:
+    parent = aliased(Folder)
+    return db.query(Folder).outerjoin(parent, Folder.parent_id == parent.id).filter(
+        Folder.deleted_at.isnot(None),
+        or_(parent.id.is_(None), parent.deleted_at.is_(None), parent.deleted_at != Folder.deleted_at),
+    ).order_by(Folder.deleted_at.desc()).all()
+
+def get_trashed_file(db: Session, file_id: int) -> Optional[File]:
+    return db.query(File).filter(File.id == file_id, File.deleted_at.isnot(None)).first()
+
+def get_trashed_folder(db: Session, folder_id: int) -> Optional[Folder]:
+    return db.query(Folder).filter(Folder.id == folder_id, Folder.deleted_at.isnot(None)).first()
+
+def _parent_is_live(db: Session, folder_id: Optional[int]) -> bool:
+    if folder_id is None:
+        return True
+    return db.query(db.query(Folder.id).filter(Folder.id == folder_id, Folder.deleted_at.is_(None)).exists()).scalar()
+
+def restore_file(db: Session, db_file: File) -> File:
+    if not _parent_is_live(db, db_file.folder_id):
+        raise ValueError("Restore the containing folder first")
+    db_file.deleted_at = None
+    record_change(db, "file", db_file.id, "create", db_file.folder_id, db_file.filename)
+    db.commit()
+    db.refresh(db_file)
+    return db_file
+
+def restore_folder_tree(db: Session, db_folder: Folder) -> Folder:
+    # Brings back everything trashed together with the folder (same deleted_at);
+    # items trashed separately before that stay in the trash
+    if not _parent_is_live(db, db_folder.parent_id):
+        raise ValueError("Restore the containing folder first")
+    subtree_ids = subtree_folder_ids(db_folder.id, deleted_at=db_folder.deleted_at)
+
+    notify_folders(db, [db_folder.id, db_folder.parent_id], {
+        "entity_type": "folder", "entity_id": db_folder.id, "action": "create", "folder_id": db_folder.id, "name": db_folder.name,
+        "subtree": True,
+    })
+    record_tree_changes(db, subtree_ids, "create", deleted_at=db_folder.deleted_at)
+    # Files first: the subtree CTE follows folders by their deleted_at
+    db.query(File).filter(
+        File.folder_id.in_(subtree_ids), File.deleted_at == db_folder.deleted_at
+    ).update({File.deleted_at: None}, synchronize_session=False)
+    db.query(Folder).filter(Folder.id.in_(subtree_ids)).update({Folder.deleted_at: None}, synchronize_session=False)
+    db.commit()
+    db.refresh(db_folder)
+    return db_folder
+
+def purge_expired_files(db: Session, cutoff: datetime, batch_size: int) -> Tuple[int, List[Tuple[str, str]]]:
+    # Hard-deletes one batch of files trashed before cutoff. Returns how many
+    # went and the blobs no longer referenced by anything, for purge_blobs.
+    ids = [row.id for row in db.query(File.id).filter(File.deleted_at < cutoff).order_by(File.deleted_at).limit(batch_size)]
+    if not ids:
+        return 0, []
+    blobs = {
+        (row.storage_type, row.storage_key)
+        for row in db.query(File.storage_type, File.storage_key).filter(File.id.in_(ids), File.storage_key.isnot(None))
+    }
+    blobs.update(
+        (row.storage_type, row.storage_key)
+        for row in db.query(FileVersion.storage_type, FileVersion.storage_key).filter(FileVersion.file_id.in_(ids)).distinct()
+    )
+    db.query(FileVersion).filter(FileVersion.file_id.in_(ids)).delete(synchronize_session=False)
+    db.query(File).filter(File.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(ids), unreferenced_blobs(db, blobs)
+
+def purge_expired_folders(db: Session, cutoff: datetime, batch_size: int) -> int:
+    # Leaves first: a folder goes once no file or subfolder, live or trashed, is left in it
+    child = aliased(Folder)
+    ids = [
+        row.id for row in db.query(Folder.id).filter(
+            Folder.deleted_at < cutoff,
+            ~exists().where(File.folder_id == Folder.id),
+            ~exists().where(child.parent_id == Folder.id),
+        ).limit(batch_size)
+    ]
+    if not ids:
+        return 0
+    db.query(FolderPermission).filter(FolderPermission.folder_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Folder).filter(Folder.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(ids)
@@ -4,8 +4,9 @@ from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash
 from typing import Optional, List
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
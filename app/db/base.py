@@ -1,5 +1,6 @@
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import declarative_base
 
+# The only declarative base; every model and alembic's target_metadata use it
 Base = declarative_base()
 
-__all__ = ["Base"]
\ No newline at end of file
+__all__ = ["Base"]
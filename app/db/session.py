@@ -1,6 +1,48 @@
+import threading
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) 
\ No newline at end of file
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    # Built on first use so importing the app (CLIs, alembic, test collection)
+    # doesn't load the DB driver or touch the pool
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if settings.DATABASE_URL.startswith("sqlite"):
+                    _engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+                else:
+                    # Sized per worker so that all workers together stay within DB_MAX_CONNECTIONS
+                    pool_size, max_overflow = settings.db_pool_limits
+                    _engine = create_engine(
+                        settings.DATABASE_URL,
+                        pool_size=pool_size,
+                        max_overflow=max_overflow,
+                        pool_pre_ping=True,
+                        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+                    )
+    return _engine
+
+def dispose_engine_after_fork():
+    # A worker forked from a preloading parent must not reuse the parent's connections
+    global _engine
+    if _engine is not None:
+        _engine.dispose(close=False)
+        _engine = None
+
+class LazyBindSession(Session):
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else get_engine(), **kwargs)
+
+SessionLocal = sessionmaker(class_=LazyBindSession, autocommit=False, autoflush=False)
+
+def __getattr__(name):
+    # `from app.db.session import engine` keeps working
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(name)
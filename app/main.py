@@ -1,13 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from dotenv import load_dotenv 
-from app.api import users_router, folders_router, files_router
+from app.api import users_router, folders_router, files_router, changes_router, events_router, trash_router, jobs_router, share_router
+from app.services.events import broker
 from app.core.config import settings
+from app.core.security import shutdown_hash_pool
+from app.services.media_metadata import shutdown_metadata_pool
+from app.services.share_links import download_counter, start_counter_flush_thread
 import os
 
 
-load_dotenv()
 app = FastAPI()
 
 app.add_middleware(
@@ -16,16 +17,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=(["X-SQL-Profile"] if settings.SQL_PROFILING else []) + (["Retry-After"] if settings.RATE_LIMIT_ENABLED else []),
 )
 
+if settings.SQL_PROFILING:
+    from app.core.profiling import SQLProfilingMiddleware
+    app.add_middleware(SQLProfilingMiddleware)
+
+if settings.RATE_LIMIT_ENABLED:
+    from app.core.rate_limit import BandwidthMiddleware
+    app.add_middleware(BandwidthMiddleware)
+
 app.include_router(users_router)
 app.include_router(folders_router)
 app.include_router(files_router)
+app.include_router(changes_router)
+app.include_router(events_router)
+app.include_router(trash_router)
+app.include_router(jobs_router)
+app.include_router(share_router)
 
-# Mount static files for local uploads
+# Local uploads are only served through /api/files/{id}/download, which checks
+# permissions before handing the file to sendfile or the fronting proxy
 if settings.STORAGE_BACKEND == "local":
     os.makedirs(settings.LOCAL_UPLOADS_PATH, exist_ok=True)
-    app.mount("/files/local", StaticFiles(directory=settings.LOCAL_UPLOADS_PATH), name="local_files")
+
+@app.on_event("startup")
+def start_background_jobs():
+    broker.start()
+    app.state.share_counter_stop = start_counter_flush_thread()
+    if settings.SCRUB_INTERVAL_HOURS > 0 and settings.STORAGE_BACKEND == "local":
+        from app.services.scrubber import start_scrubber_thread
+        app.state.scrubber_stop = start_scrubber_thread()
+    if settings.TRASH_PURGE_INTERVAL_MINUTES > 0:
+        from app.services.trash_purger import start_trash_purger_thread
+        app.state.trash_purger_stop = start_trash_purger_thread()
+
+@app.on_event("shutdown")
+def stop_hash_pool():
+    shutdown_hash_pool()
+    shutdown_metadata_pool()
+    broker.stop()
+    # Download counts not yet written would otherwise be lost
+    app.state.share_counter_stop.set()
+    download_counter.flush()
+    if getattr(app.state, "scrubber_stop", None):
+        app.state.scrubber_stop.set()
+    if getattr(app.state, "trash_purger_stop", None):
+        app.state.trash_purger_stop.set()
 
 @app.get("/")
 def root():
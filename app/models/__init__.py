@@ -1,4 +1,10 @@
 from .user import User, RoleEnum
 from .folder import Folder
 from .file import File
-from .folder_permissions import FolderPermission
\ No newline at end of file
+from .file_version import FileVersion
+from .folder_permissions import FolderPermission
+from .token_version import UserTokenVersion
+from .change import ChangeEvent
+from .job import Job
+from .media_attributes import MediaAttributes
+from .share_link import ShareLink
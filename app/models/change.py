@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class ChangeEvent(Base):
+    # Append-only; the primary key doubles as the sync cursor
+    __tablename__ = "change_log"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False)  # 'file', 'folder' or 'permission'
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # create, update, rename, move, delete, grant, revoke
+    folder_id = Column(Integer, nullable=True, index=True)  # folder whose permissions govern visibility
+    old_folder_id = Column(Integer, nullable=True)  # previous location for moves
+    user_id = Column(Integer, nullable=True)  # permission events: the affected user
+    name = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
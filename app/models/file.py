@@ -1,18 +1,37 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from datetime import datetime
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # Partial indexes: live listings never touch trashed rows, and the purger only scans the trash
+        Index("ix_files_folder_id_live", "folder_id", postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_files_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL"), sqlite_where=text("deleted_at IS NOT NULL")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String)
-    folder_id = Column(Integer, ForeignKey('folders.id'))
+    # Besides the live partial index: the FK check when the purger deletes folders and
+    # the lookups of trashed files by folder (tree restore, folder purge) need all rows
+    folder_id = Column(Integer, ForeignKey('folders.id'), index=True)
     s3_key = Column(String, nullable=True)
-    uploaded_by = Column(Integer, ForeignKey('users.id'))
+    uploaded_by = Column(Integer, ForeignKey('users.id'), index=True)
     storage_type = Column(String, default="s3")  # 's3' or 'local'
     storage_key = Column(String, nullable=True)   # s3 key or local path
     file_size = Column(Integer, nullable=True)
+    content_encoding = Column(String, nullable=True)  # at-rest compression: 'gzip', 'zstd' or None
+    sha256 = Column(String(64), nullable=True, index=True)  # hex digest of the original content
+    version = Column(Integer, default=1)  # number of the FileVersion the blob columns above belong to
     created_at = Column(DateTime, default=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)  # set while the file is in the trash
     folder = relationship("Folder", back_populates="files")
-    uploader = relationship("User", back_populates="files") 
\ No newline at end of file
+    uploader = relationship("User", back_populates="files")
+    versions = relationship("FileVersion", back_populates="file", cascade="all, delete-orphan", order_by="FileVersion.version")
+    attributes = relationship(
+        "MediaAttributes",
+        primaryjoin="foreign(File.sha256) == MediaAttributes.sha256",
+        uselist=False,
+        viewonly=True,
+    )
+ 
\ No newline at end of file
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+from datetime import datetime
+
+class FileVersion(Base):
+    # Content history of a file; File mirrors the blob columns of its current
+    # version. Versions with identical content share one blob (same storage_key),
+    # so a blob is only deleted once no File or FileVersion row references it.
+    __tablename__ = "file_versions"
+    __table_args__ = (
+        UniqueConstraint("file_id", "version", name="uq_file_versions_file_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, ForeignKey('files.id', ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    storage_type = Column(String, nullable=False)
+    storage_key = Column(String, nullable=False, index=True)
+    file_size = Column(Integer, nullable=True)
+    content_encoding = Column(String, nullable=True)
+    sha256 = Column(String(64), nullable=True, index=True)
+    uploaded_by = Column(Integer, ForeignKey('users.id'))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    file = relationship("File", back_populates="versions")
@@ -1,15 +1,20 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class Folder(Base):
     __tablename__ = "folders"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_folders_parent_id_live", "parent_id", postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_folders_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL"), sqlite_where=text("deleted_at IS NOT NULL")),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    parent_id = Column(Integer, ForeignKey('folders.id'), nullable=True)
-    owner_id = Column(Integer, ForeignKey('users.id'))
+    parent_id = Column(Integer, ForeignKey('folders.id'), nullable=True, index=True)
+    owner_id = Column(Integer, ForeignKey('users.id'), index=True)
+    deleted_at = Column(DateTime, nullable=True)  # set while the folder is in the trash; its subtree shares the timestamp
     owner = relationship("User")
     files = relationship("File", back_populates="folder")
     parent = relationship("Folder", remote_side=[id])
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from app.models.user import RoleEnum
 
 class FolderPermission(Base):
     __tablename__ = "folder_permissions"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        UniqueConstraint("folder_id", "user_id", name="uq_folder_permissions_folder_user"),
+        Index("ix_folder_permissions_user_folder", "user_id", "folder_id", "permission"),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     folder_id = Column(Integer, ForeignKey("folders.id"), nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class Job(Base):
+    # Long-running work started by a request (e.g. large folder copies); clients poll it for progress
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # e.g. 'folder_copy'
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    result_id = Column(Integer, nullable=True)  # id of the created entity once done
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
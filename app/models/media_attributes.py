@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class MediaAttributes(Base):
+    # Extracted from the content after upload. Keyed by the content digest, so
+    # deduplicated blobs, copies and restored versions share one row and one extraction.
+    __tablename__ = "media_attributes"
+
+    sha256 = Column(String(64), primary_key=True)
+    mime_type = Column(String, nullable=True, index=True)  # sniffed from the content; None if unrecognised
+    width = Column(Integer, nullable=True, index=True)
+    height = Column(Integer, nullable=True, index=True)
+    page_count = Column(Integer, nullable=True, index=True)
+    duration = Column(Float, nullable=True, index=True)  # seconds
+    extracted_at = Column(DateTime, default=datetime.utcnow)
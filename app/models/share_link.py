@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class ShareLink(Base):
+    # Public link to one file or folder tree. The token handed out is signed and
+    # carries the link id, target and expiry; this row holds what can change.
+    __tablename__ = "share_links"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, ForeignKey('files.id', ondelete="CASCADE"), nullable=True, index=True)
+    folder_id = Column(Integer, ForeignKey('folders.id', ondelete="CASCADE"), nullable=True, index=True)
+    created_by = Column(Integer, ForeignKey('users.id'), index=True)
+    password_hash = Column(String, nullable=True)
+    max_downloads = Column(Integer, nullable=True)  # None = unlimited
+    download_count = Column(Integer, default=0)  # flushed in batches, so it trails live downloads by a few seconds
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
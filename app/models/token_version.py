@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime
+from app.db.base import Base
+from datetime import datetime
+
+class UserTokenVersion(Base):
+    # Only users whose tokens were ever revoked get a row, so this stays small
+    # enough to be cached in full by every worker. No FK so a deleted user's
+    # revocation outlives the user row.
+    __tablename__ = "user_token_versions"
+
+    user_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,8 @@
 from .user import *
 from .folder import *
 from .file import *
-from .token import * 
\ No newline at end of file
+from .token import *
+from .change import *
+from .trash import *
+from .job import *
+from .share import *
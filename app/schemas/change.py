@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ChangeOut(BaseModel):
+    id: int
+    entity_type: str
+    entity_id: int
+    action: str
+    folder_id: Optional[int] = None
+    old_folder_id: Optional[int] = None
+    user_id: Optional[int] = None
+    name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ChangesPage(BaseModel):
+    changes: List[ChangeOut]
+    cursor: int  # pass back as `since` to continue
+    has_more: bool
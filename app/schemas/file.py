@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class FileBase(BaseModel):
     filename: str
@@ -15,8 +15,36 @@ class FileUpdate(BaseModel):
 class FileMove(BaseModel):
     new_folder_id: int
 
+class FileCopy(BaseModel):
+    target_folder_id: int
+    filename: Optional[str] = None  # defaults to the source name
+
 from datetime import datetime
 
+class MediaAttributesOut(BaseModel):
+    mime_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    page_count: Optional[int] = None
+    duration: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class FileListFilters(BaseModel):
+    # Query parameters of the file listing; attribute filters only match files whose metadata has been extracted
+    mime_type: Optional[str] = None  # exact, or a prefix such as 'image/*'
+    min_width: Optional[int] = None
+    max_width: Optional[int] = None
+    min_height: Optional[int] = None
+    max_height: Optional[int] = None
+    min_pages: Optional[int] = None
+    max_pages: Optional[int] = None
+    min_duration: Optional[float] = None
+    max_duration: Optional[float] = None
+    sort: Literal["name", "created_at", "size", "mime_type", "width", "height", "pages", "duration"] = "name"
+    order: Literal["asc", "desc"] = "asc"
+
 class FileOut(FileBase):
     id: int
     s3_key: Optional[str] = None
@@ -24,7 +52,21 @@ class FileOut(FileBase):
     storage_type: Optional[str] = None
     storage_key: Optional[str] = None
     file_size: Optional[int] = None
+    sha256: Optional[str] = None
+    version: Optional[int] = None
     created_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
+    attributes: Optional[MediaAttributesOut] = None
     
+    class Config:
+        from_attributes = True
+
+class FileVersionOut(BaseModel):
+    version: int
+    file_size: Optional[int] = None
+    sha256: Optional[str] = None
+    uploaded_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+
     class Config:
         from_attributes = True 
\ No newline at end of file
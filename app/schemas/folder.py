@@ -13,11 +13,16 @@ class FolderCreate(FolderBase):
 class FolderUpdate(BaseModel):
     name: Optional[str] = None
 
+class FolderCopy(BaseModel):
+    target_parent_id: Optional[int] = None  # None copies to the top level
+    name: Optional[str] = None  # defaults to the source name
+
 class FolderOut(FolderBase):
     id: int
     owner_id: int
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
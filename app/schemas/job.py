@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    total: int = 0
+    completed: int = 0
+    result_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,60 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.file import MediaAttributesOut
+
+class ShareLinkCreate(BaseModel):
+    # Exactly one of file_id / folder_id
+    file_id: Optional[int] = None
+    folder_id: Optional[int] = None
+    expires_in_hours: Optional[int] = None  # defaults to SHARE_LINK_DEFAULT_HOURS
+    password: Optional[str] = None
+    max_downloads: Optional[int] = None
+
+class ShareLinkOut(BaseModel):
+    id: int
+    file_id: Optional[int] = None
+    folder_id: Optional[int] = None
+    max_downloads: Optional[int] = None
+    download_count: int = 0
+    expires_at: datetime
+    revoked_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    has_password: bool = False
+    token: Optional[str] = None  # only returned when the link is created
+
+    class Config:
+        from_attributes = True
+
+class ShareUnlock(BaseModel):
+    password: str
+
+class ShareToken(BaseModel):
+    token: str
+    expires_at: datetime
+
+class SharedFileOut(BaseModel):
+    id: int
+    filename: str
+    file_size: Optional[int] = None
+    created_at: Optional[datetime] = None
+    attributes: Optional[MediaAttributesOut] = None
+
+    class Config:
+        from_attributes = True
+
+class SharedFolderEntry(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+class SharedItemOut(BaseModel):
+    # What a share token opens: a file, or one folder of the shared tree
+    expires_at: datetime
+    downloads_left: Optional[int] = None
+    file: Optional[SharedFileOut] = None
+    folder: Optional[SharedFolderEntry] = None
+    folders: List[SharedFolderEntry] = []
+    files: List[SharedFileOut] = []
@@ -1,9 +1,18 @@
 from pydantic import BaseModel
 from typing import Optional
+from app.models.user import RoleEnum
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
-    username: Optional[str] = None 
\ No newline at end of file
+    # Principal built from verified access token claims (see api.deps.get_current_user)
+    username: Optional[str] = None
+    id: Optional[int] = None
+    role: Optional[RoleEnum] = None
+    is_active: bool = True
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str 
\ No newline at end of file
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.file import FileOut
+from app.schemas.folder import FolderOut
+
+class TrashOut(BaseModel):
+    # Only the top-level trashed items; contents of a trashed folder come back with it
+    files: List[FileOut]
+    folders: List[FolderOut]
@@ -0,0 +1,31 @@
+import base64
+import hashlib
+from typing import BinaryIO, NamedTuple, Optional
+
+
+class StoredBlob(NamedTuple):
+    storage_key: str
+    size: int
+    sha256: str  # hex digest of the original (uncompressed) content
+    content_encoding: Optional[str] = None
+
+
+class HashingReader:
+    # Wraps a file object and hashes whatever passes through read()
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.raw.read(size)
+        self.hash.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self.hash.hexdigest()
+
+
+def sha256_b64(hex_digest: str) -> str:
+    return base64.b64encode(bytes.fromhex(hex_digest)).decode()
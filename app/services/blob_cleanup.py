@@ -0,0 +1,26 @@
+import logging
+from typing import Iterable, Tuple
+
+from app.services.local_storage import delete_local_file
+
+logger = logging.getLogger(__name__)
+
+
+def purge_blobs(blobs: Iterable[Tuple[str, str]]):
+    # Runs as a background task after the metadata rows are already gone
+    local_keys = [key for storage_type, key in blobs if storage_type == "local"]
+    s3_keys = [key for storage_type, key in blobs if storage_type == "s3"]
+
+    for key in local_keys:
+        try:
+            delete_local_file(key)
+        except OSError:
+            # Left as an orphan for the reconciler to report
+            logger.exception("Failed to delete local blob %s", key)
+
+    if s3_keys:
+        from app.services.s3 import delete_s3_objects
+        try:
+            delete_s3_objects(s3_keys)
+        except Exception:
+            logger.exception("Failed to delete %d S3 objects", len(s3_keys))
@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.crud.folder import copy_folder_tree
+from app.crud.job import update_job
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run_folder_copy_job(job_id: int, folder_id: int, parent_id: Optional[int], user_id: int, name: Optional[str] = None):
+    # Runs as a background task. The copy is one transaction on its own session;
+    # progress goes through a second session so pollers see it before the commit.
+    db = SessionLocal()
+    progress_db = SessionLocal()
+
+    def report(copied: int):
+        try:
+            update_job(progress_db, job_id, completed=copied)
+        except Exception:
+            # Progress is informational; never let it fail the copy
+            progress_db.rollback()
+            logger.debug("Could not record progress for job %s", job_id, exc_info=True)
+
+    try:
+        update_job(progress_db, job_id, status="running")
+        folder = copy_folder_tree(db, folder_id, parent_id, user_id, name, settings.COPY_BATCH_SIZE, report)
+        update_job(progress_db, job_id, status="done", result_id=folder.id)
+    except Exception as e:
+        db.rollback()
+        progress_db.rollback()
+        logger.exception("Folder copy job %s failed", job_id)
+        update_job(progress_db, job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+        progress_db.close()
@@ -163,6 +163,11 @@ class EmailService:
             print(f"Email sending failed: {e}")
             return False
 
-email_service = EmailService()
-
+_email_service = None
 
+def get_email_service() -> EmailService:
+    # Created on first send rather than at import
+    global _email_service
+    if _email_service is None:
+        _email_service = EmailService()
+    return _email_service
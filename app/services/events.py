@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Set, Tuple
+
+from app.core.config import settings
+from app.core.shared_state import get_redis
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[int, dict], None]
+
+# Channel for changes at the top level (folder_id / parent_id None); folder ids start at 1
+ROOT_CHANNEL = 0
+
+
+class LocalBackend:
+    # Single-process stand-in: published messages go straight back to this worker's subscribers
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    def publish(self, folder_id: int, message: dict):
+        if self._deliver:
+            self._deliver(folder_id, message)
+
+    def stop(self):
+        self._deliver = None
+
+
+class RedisBackend:
+    # Fans messages out to every worker through Redis pub/sub
+    CHANNEL_PREFIX = "atc-drive:folder:"
+
+    def __init__(self):
+        self._thread = None
+
+    def start(self, deliver: Deliver):
+        def handle(msg):
+            folder_id = int(msg["channel"].decode().rsplit(":", 1)[1])
+            deliver(folder_id, json.loads(msg["data"]))
+
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{self.CHANNEL_PREFIX + "*": handle})
+        self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, folder_id: int, message: dict):
+        get_redis().publish(f"{self.CHANNEL_PREFIX}{folder_id}", json.dumps(message, default=str))
+
+    def stop(self):
+        if self._thread:
+            self._thread.stop()
+
+
+class EventBroker:
+    """Per-folder pub/sub between request handlers and streaming subscribers.
+
+    publish() may be called from any thread (sync handlers run in the
+    threadpool); each subscriber queue is fed on the event loop it was created
+    on. Slow subscribers drop messages rather than grow without bound.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscribers: Dict[int, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = defaultdict(set)
+        self._listeners: List[Deliver] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.backend.start(self._deliver)
+
+    def stop(self):
+        self.backend.stop()
+
+    def add_listener(self, listener: Deliver):
+        # Called with every (folder_id, message) this worker receives, on the backend's thread
+        self._listeners.append(listener)
+
+    def subscribe(self, folder_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[folder_id].add((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, folder_id: int, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers[folder_id] = {s for s in self._subscribers[folder_id] if s[0] is not queue}
+            if not self._subscribers[folder_id]:
+                del self._subscribers[folder_id]
+
+    def publish(self, folder_id: int, message: dict):
+        try:
+            self.backend.publish(folder_id, message)
+        except Exception:
+            # Notifications are best-effort; clients can always catch up via /api/changes
+            logger.exception("Failed to publish event for folder %s", folder_id)
+
+    def _deliver(self, folder_id: int, message: dict):
+        for listener in self._listeners:
+            try:
+                listener(folder_id, message)
+            except Exception:
+                logger.exception("Event listener failed")
+        with self._lock:
+            subscribers = list(self._subscribers.get(folder_id, ()))
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: dict):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+def _make_backend():
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisBackend()
+    return LocalBackend()
+
+
+broker = EventBroker(_make_backend())
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.services.events import ROOT_CHANNEL, broker
+
+
+class ListingCache:
+    """Serialized folder/file listings keyed by (kind, user, parent, page).
+
+    Every entry remembers the generation of the folder it lists and of the
+    user it was built for. Change events bump those generations (folder
+    events via their channel, permission events via their user), which
+    invalidates affected entries without scanning the cache. Events reach
+    every worker through the broker backend; the TTL bounds staleness if an
+    event is ever missed. Trashing or restoring a tree is published only on
+    its root, with "subtree" set, and bumps one generation shared by every
+    entry, since any folder below the root may be cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, int, int], float, str, bytes]]" = OrderedDict()
+        self._folder_generations: Dict[int, int] = defaultdict(int)
+        self._user_generations: Dict[int, int] = defaultdict(int)
+        self._tree_generation = 0
+        self._lock = threading.Lock()
+
+    def generations(self, folder_id: Optional[int], user_id: Optional[int]) -> Tuple[int, int, int]:
+        folder_gen = self._folder_generations.get(ROOT_CHANNEL if folder_id is None else folder_id, 0)
+        user_gen = self._user_generations.get(user_id, 0) if user_id is not None else 0
+        return folder_gen, user_gen, self._tree_generation
+
+    def get(self, key: Hashable, generations: Tuple[int, int, int]) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_generations, expires, etag, body = entry
+            if entry_generations != generations or expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag, body
+
+    def put(self, key: Hashable, generations: Tuple[int, int, int], body: bytes) -> Tuple[str, bytes]:
+        etag = content_etag(body)
+        with self._lock:
+            self._entries[key] = (generations, time.monotonic() + self.ttl_seconds, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def on_change(self, folder_id: int, message: dict):
+        with self._lock:
+            self._folder_generations[folder_id] += 1
+            if message.get("subtree"):
+                self._tree_generation += 1
+            # Grants and revokes change which folders that user can see anywhere
+            if message.get("entity_type") == "permission" and message.get("user_id") is not None:
+                self._user_generations[message["user_id"]] += 1
+
+
+listing_cache = ListingCache(settings.LISTING_CACHE_MAX_ENTRIES, settings.LISTING_CACHE_TTL_SECONDS)
+broker.add_listener(listing_cache.on_change)
+
+
+def content_etag(body: bytes) -> str:
+    # Hash of the content, so it is comparable across workers and restarts
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def cached_listing(
+    request: Request,
+    key: Hashable,
+    folder_id: Optional[int],
+    user_id: Optional[int],
+    load: Callable[[], object],
+) -> Response:
+    # Generations are read before loading, so a write that lands mid-query
+    # leaves the new entry already stale rather than wrongly fresh
+    enabled = settings.LISTING_CACHE_TTL_SECONDS > 0
+    generations = listing_cache.generations(folder_id, user_id)
+    entry = listing_cache.get(key, generations) if enabled else None
+    if entry is None:
+        body = json.dumps(jsonable_encoder(load()), separators=(",", ":")).encode()
+        entry = listing_cache.put(key, generations, body) if enabled else (content_etag(body), body)
+    etag, body = entry
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
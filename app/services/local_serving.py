@@ -0,0 +1,178 @@
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.core.config import settings
+from app.services.local_storage import CHUNK_SIZE, open_decompressed
+from app.services.blob import sha256_b64
+
+# Fallback when the content's type wasn't sniffed
+EXTENSION_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'css': 'text/css',
+    'js': 'text/javascript',
+    'json': 'application/json',
+    'xml': 'text/xml',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'svg': 'image/svg+xml',
+    'zip': 'application/zip',
+    'rar': 'application/x-rar-compressed',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xls': 'application/vnd.ms-excel',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ppt': 'application/vnd.ms-powerpoint',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+}
+GENERIC_MIME_TYPES = {"application/zip", "application/octet-stream"}
+
+
+def media_type_for(filename: str, sniffed: Optional[str] = None) -> str:
+    # The type sniffed at upload wins, except for generic containers (a .docx sniffs as zip)
+    if sniffed and sniffed not in GENERIC_MIME_TYPES:
+        return sniffed
+    file_ext = filename.split('.')[-1].lower() if '.' in filename else ''
+    return EXTENSION_MIME_TYPES.get(file_ext, 'application/octet-stream')
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        q = params.strip()
+        if not q.startswith("q="):
+            return True
+        try:
+            return float(q[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def integrity_headers(sha256: Optional[str], content_encoding: Optional[str] = None) -> dict:
+    # The ETag identifies the content; the encoded representation gets its own tag.
+    # Digest is only valid for the identity bytes.
+    if not sha256:
+        return {}
+    if content_encoding:
+        return {"ETag": f'"{sha256}-{content_encoding}"'}
+    return {"ETag": f'"{sha256}"', "Digest": f"sha-256={sha256_b64(sha256)}"}
+
+
+def matches_etag(if_none_match: Optional[str], sha256: Optional[str]) -> bool:
+    if not if_none_match or not sha256:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-")[0] == sha256:
+            return True
+    return False
+
+
+def _iter_decompressed(file_path: str, encoding: str):
+    with open_decompressed(file_path, encoding) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+class SendfileResponse(FileResponse):
+    """FileResponse that hands the file to the server when it supports zero-copy.
+
+    Servers advertising the ASGI `http.response.zerocopy` extension call
+    os.sendfile() themselves, so the bytes never pass through Python. Neither
+    uvicorn nor starlette implements it, so under them this is the regular
+    streamed FileResponse, as it is for Range and HEAD requests.
+    """
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions") or {}
+        headers = dict(scope.get("headers") or [])
+        if (
+            "http.response.zerocopy" not in extensions
+            or scope.get("method") == "HEAD"
+            or b"range" in headers
+        ):
+            return await super().__call__(scope, receive, send)
+
+        stat_result = os.stat(self.path)
+        self.set_stat_headers(stat_result)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as f:
+            await send({
+                "type": "http.response.zerocopy",
+                "file": f,
+                "count": stat_result.st_size,
+                "more_body": False,
+            })
+
+
+def local_file_response(
+    storage_key: str,
+    filename: str,
+    media_type: str,
+    content_encoding: Optional[str] = None,
+    accept_encoding: str = "",
+    original_size: Optional[int] = None,
+    sha256: Optional[str] = None,
+) -> Response:
+    # Only called after the permission check in the download endpoint
+    file_path = os.path.join(settings.LOCAL_UPLOADS_PATH, storage_key)
+    if content_encoding:
+        # Compressed blobs are always served by the app: proxies may strip Content-Encoding
+        # on internal redirects, and clients without support need a decompressing stream
+        headers = {"Content-Disposition": _content_disposition(filename), "Vary": "Accept-Encoding"}
+        if accepts_encoding(accept_encoding, content_encoding):
+            headers.update(integrity_headers(sha256, content_encoding))
+            headers["Content-Encoding"] = content_encoding
+            return SendfileResponse(path=file_path, media_type=media_type, headers=headers)
+        headers.update(integrity_headers(sha256))
+        if original_size is not None:
+            headers["Content-Length"] = str(original_size)
+        return StreamingResponse(_iter_decompressed(file_path, content_encoding), media_type=media_type, headers=headers)
+
+    mode = settings.LOCAL_SERVE_MODE
+    if mode == "x-accel":
+        # nginx serves the file from an `internal` location mapped to LOCAL_UPLOADS_PATH
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": settings.LOCAL_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(storage_key),
+                "Content-Disposition": _content_disposition(filename),
+                **integrity_headers(sha256),
+            },
+        )
+    if mode == "x-sendfile":
+        # Apache mod_xsendfile / lighttpd take an absolute filesystem path
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Sendfile": os.path.abspath(file_path),
+                "Content-Disposition": _content_disposition(filename),
+                **integrity_headers(sha256),
+            },
+        )
+    return SendfileResponse(
+        path=file_path,
+        filename=filename,
+        media_type=media_type,
+        headers=integrity_headers(sha256),
+    )
@@ -1,44 +1,106 @@
+import gzip
+import hashlib
 import os
+import shutil
+import zlib
 from fastapi import UploadFile
+from typing import BinaryIO, Optional
 from uuid import uuid4
 from app.core.config import settings
+from app.services.blob import HashingReader, StoredBlob
 
-def save_file_locally(file: UploadFile, folder: str = "") -> str:
+try:
+    import zstandard
+except ImportError:  # optional, gzip is used when zstd is configured but unavailable
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+
+# Text-like formats that typically shrink 5-10x; everything else is stored as-is
+COMPRESSIBLE_EXTENSIONS = {
+    "txt", "csv", "json", "xml", "sql", "yaml", "yml", "md", "rtf", "svg",
+    "html", "css", "js", "ts", "jsx", "tsx", "py", "php", "java", "cpp", "c", "cs",
+    "sh", "bat", "ps1",
+}
+ENCODING_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# Raised while reading truncated or damaged compressed blobs
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+def sharded_key(filename: str) -> str:
+    # Two levels of 256 directories keep every directory small even at millions of blobs
+    digest = hashlib.md5(filename.encode()).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{filename}"
+
+def is_sharded_key(key: str) -> bool:
+    # Legacy keys can look the same ("10/ab/<uuid>.png"), so compare with the real shard
+    return key == sharded_key(os.path.basename(key))
+
+def choose_encoding(filename: str) -> Optional[str]:
+    mode = settings.LOCAL_COMPRESSION
+    if mode not in ENCODING_SUFFIXES:
+        return None
+    ext = filename.split(".")[-1].lower() if "." in filename else ""
+    if ext not in COMPRESSIBLE_EXTENSIONS:
+        return None
+    if mode == "zstd" and zstandard is None:
+        return "gzip"
+    return mode
+
+def _write_blob(src: BinaryIO, file_path: str, encoding: Optional[str]):
+    with open(file_path, "wb") as f:
+        if encoding == "gzip":
+            with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=settings.LOCAL_COMPRESSION_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, CHUNK_SIZE)
+        elif encoding == "zstd":
+            with zstandard.ZstdCompressor(level=settings.LOCAL_COMPRESSION_LEVEL).stream_writer(f, closefd=False) as zf:
+                shutil.copyfileobj(src, zf, CHUNK_SIZE)
+        else:
+            shutil.copyfileobj(src, f, CHUNK_SIZE)
+
+def open_decompressed(file_path: str, encoding: Optional[str]) -> BinaryIO:
+    if encoding == "gzip":
+        return gzip.open(file_path, "rb")
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+    return open(file_path, "rb")
+
+def save_file_locally(file: UploadFile, folder: str = "") -> StoredBlob:
     # Create uploads directory if it doesn't exist
     uploads_dir = settings.LOCAL_UPLOADS_PATH
     os.makedirs(uploads_dir, exist_ok=True)
     
-    # Create folder directory if specified
-    if folder:
-        dir_path = os.path.join(uploads_dir, folder)
-        os.makedirs(dir_path, exist_ok=True)
-    else:
-        dir_path = uploads_dir
-    
     # Generate unique filename
     ext = file.filename.split(".")[-1] if "." in file.filename else ""
     filename = f"{uuid4()}.{ext}" if ext else str(uuid4())
+    encoding = choose_encoding(file.filename)
+    if encoding:
+        filename += ENCODING_SUFFIXES[encoding]
     
-    # Save file
-    file_path = os.path.join(dir_path, filename)
+    # The sharded layout ignores the client folder path; the hierarchy lives in the DB
+    if settings.LOCAL_STORAGE_LAYOUT == "sharded":
+        file_path = os.path.join(uploads_dir, sharded_key(filename))
+    elif folder:
+        file_path = os.path.join(uploads_dir, folder, filename)
+    else:
+        file_path = os.path.join(uploads_dir, filename)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
-    # Read file content and write to disk
-    file_content = file.file.read()
-    with open(file_path, "wb") as f:
-        f.write(file_content)
+    # Copy in chunks rather than holding the whole upload in memory, hashing as we go
+    reader = HashingReader(file.file)
+    _write_blob(reader, file_path, encoding)
     
-    # Return relative path from uploads directory
-    return os.path.relpath(file_path, uploads_dir)
-
-def get_local_file_url(key: str) -> str:
-    return f"/files/local/{key}"
+    return StoredBlob(
+        storage_key=os.path.relpath(file_path, uploads_dir),
+        size=reader.size,
+        sha256=reader.hexdigest(),
+        content_encoding=encoding,
+    )
 
 def delete_local_file(key: str) -> bool:
+    # False if it was already gone; any other failure (permissions, I/O) is raised
     try:
-        file_path = os.path.join(settings.LOCAL_UPLOADS_PATH, key)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return True
-        return False
-    except Exception:
+        os.remove(os.path.join(settings.LOCAL_UPLOADS_PATH, key))
+        return True
+    except FileNotFoundError:
         return False
\ No newline at end of file
@@ -0,0 +1,403 @@
+"""Media metadata extraction.
+
+Only headers and container indexes are parsed (plus a scan for PDF page
+objects), using the standard library. Formats are recognised by their
+content, not their extension.
+"""
+import argparse
+import logging
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.crud.media import files_missing_attributes, get_media_attributes, save_media_attributes
+from app.db.session import SessionLocal
+from app.services.local_storage import open_decompressed
+
+logger = logging.getLogger(__name__)
+
+HEAD_SIZE = 4096
+SCAN_CHUNK = 1024 * 1024
+
+ReadAt = Callable[[int, int], bytes]
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head.startswith(b"BM") and len(head) >= 26:
+        return "image/bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if head.startswith(b"\x00\x00\x01\x00"):
+        return "image/x-icon"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head[:4] == b"RIFF":
+        return {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand == b"qt  ":
+            return "video/quicktime"
+        if brand in (b"M4A ", b"M4B "):
+            return "audio/mp4"
+        if brand in (b"heic", b"heix", b"mif1"):
+            return "image/heic"
+        return "video/mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm" if b"webm" in head[:64] else "video/x-matroska"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE6 == 0xE2):
+        return "audio/mpeg"
+    if head.startswith(b"PK\x03\x04"):
+        # OpenDocument stores its type uncompressed as the first member
+        if head[30:38] == b"mimetype":
+            length = int.from_bytes(head[18:22], "little")
+            return head[38:38 + min(length, 100)].decode("ascii", "ignore") or "application/zip"
+        return "application/zip"
+    if head.startswith(b"\x1f\x8b"):
+        return "application/gzip"
+    if head.startswith(b"7z\xbc\xaf\x27\x1c"):
+        return "application/x-7z-compressed"
+    if head.startswith(b"Rar!\x1a\x07"):
+        return "application/vnd.rar"
+    return None
+
+
+def _png(read_at: ReadAt, size: int) -> Dict:
+    width, height = struct.unpack(">II", read_at(16, 8))
+    return {"width": width, "height": height}
+
+
+def _gif(read_at: ReadAt, size: int) -> Dict:
+    width, height = struct.unpack("<HH", read_at(6, 4))
+    return {"width": width, "height": height}
+
+
+def _bmp(read_at: ReadAt, size: int) -> Dict:
+    width, height = struct.unpack("<ii", read_at(18, 8))
+    return {"width": abs(width), "height": abs(height)}  # negative height means top-down rows
+
+
+def _webp(read_at: ReadAt, size: int) -> Dict:
+    chunk = read_at(12, 18)
+    kind, data = chunk[:4], chunk[8:]
+    if kind == b"VP8 ":
+        width, height = struct.unpack("<HH", data[6:10])
+        return {"width": width & 0x3FFF, "height": height & 0x3FFF}
+    if kind == b"VP8L":
+        bits = int.from_bytes(data[1:5], "little")
+        return {"width": (bits & 0x3FFF) + 1, "height": ((bits >> 14) & 0x3FFF) + 1}
+    if kind == b"VP8X":
+        return {"width": int.from_bytes(data[4:7], "little") + 1, "height": int.from_bytes(data[7:10], "little") + 1}
+    return {}
+
+
+def _jpeg(read_at: ReadAt, size: int) -> Dict:
+    # Walk the marker segments up to the first start-of-frame
+    offset = 2
+    while offset + 4 <= size:
+        marker, length = struct.unpack(">xBH", read_at(offset, 4))
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", read_at(offset + 5, 4))
+            return {"width": width, "height": height}
+        offset += 2 + length
+    return {}
+
+
+def _iter_boxes(read_at: ReadAt, start: int, end: int):
+    # ISO BMFF boxes: (type, payload offset, box end)
+    offset = start
+    while offset + 8 <= end:
+        header = read_at(offset, 16)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size:
+            return
+        yield box_type, offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _mp4(read_at: ReadAt, size: int) -> Dict:
+    # mvhd gives the duration, the first video track's tkhd the dimensions
+    attrs = {}
+    for box_type, payload, end in _iter_boxes(read_at, 0, size):
+        if box_type != b"moov":
+            continue
+        for child_type, child, child_end in _iter_boxes(read_at, payload, end):
+            if child_type == b"mvhd":
+                data = read_at(child, 32)
+                if data[0] == 1:
+                    timescale, duration = struct.unpack(">IQ", data[20:32])
+                else:
+                    timescale, duration = struct.unpack(">II", data[12:20])
+                if timescale:
+                    attrs["duration"] = duration / timescale
+            elif child_type == b"trak" and "width" not in attrs:
+                for track_type, track, _ in _iter_boxes(read_at, child, child_end):
+                    if track_type == b"tkhd":
+                        data = read_at(track, 96)
+                        dims = data[88:96] if data[0] == 1 else data[76:84]
+                        width, height = (value >> 16 for value in struct.unpack(">II", dims))
+                        if width and height:
+                            attrs["width"], attrs["height"] = width, height
+        break
+    return attrs
+
+
+def _wav(read_at: ReadAt, size: int) -> Dict:
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= size:
+        chunk_id, chunk_size = struct.unpack("<4sI", read_at(offset, 8))
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", read_at(offset + 16, 4))[0]
+        elif chunk_id == b"data" and byte_rate:
+            return {"duration": min(chunk_size, size - offset - 8) / byte_rate}
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return {}
+
+
+def _flac(read_at: ReadAt, size: int) -> Dict:
+    # STREAMINFO is always the first metadata block: 20-bit sample rate ... 36-bit total samples
+    bits = int.from_bytes(read_at(18, 8), "big")
+    sample_rate = bits >> 44
+    total_samples = bits & ((1 << 36) - 1)
+    return {"duration": total_samples / sample_rate} if sample_rate and total_samples else {}
+
+
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1 layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2/2.5 layer III
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3(read_at: ReadAt, size: int) -> Dict:
+    offset = 0
+    head = read_at(0, 10)
+    if head.startswith(b"ID3"):
+        tag_size = 0
+        for byte in head[6:10]:  # syncsafe integer
+            tag_size = (tag_size << 7) | (byte & 0x7F)
+        offset = 10 + tag_size
+    frame = read_at(offset, 200)
+    if len(frame) < 4 or frame[0] != 0xFF or frame[1] & 0xE0 != 0xE0:
+        return {}
+    version = (frame[1] >> 3) & 0x3
+    bitrate_index, rate_index = frame[2] >> 4, (frame[2] >> 2) & 0x3
+    if version == 1 or rate_index == 3 or bitrate_index in (0, 15):
+        return {}
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    # A Xing/Info header carries the frame count (VBR files); otherwise assume constant bitrate
+    for tag in (b"Xing", b"Info"):
+        position = frame.find(tag)
+        if position != -1 and struct.unpack(">I", frame[position + 4:position + 8])[0] & 1:
+            frames = struct.unpack(">I", frame[position + 8:position + 12])[0]
+            return {"duration": frames * samples_per_frame / sample_rate}
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    return {"duration": (size - offset) * 8 / bitrate}
+
+
+_PAGES_COUNT = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+_PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![s\w])")
+
+
+def _pdf(read_at: ReadAt, size: int) -> Dict:
+    # The root page tree's /Count is the page count; counting page objects covers
+    # files whose page tree sits in a compressed object stream (then 0 if both are)
+    page_tree_count = page_objects = 0
+    overlap = 512
+    offset = 0
+    tail = b""
+    while offset < size:
+        chunk = read_at(offset, SCAN_CHUNK)
+        if not chunk:
+            break
+        offset += len(chunk)
+        data = tail + chunk
+        # Matches starting in the last `overlap` bytes are counted with the next chunk instead
+        limit = len(data) - overlap if offset < size else len(data)
+        for match in _PAGES_COUNT.finditer(data):
+            if match.start() < limit:
+                page_tree_count = max(page_tree_count, int(match.group(1) or match.group(2)))
+        page_objects += sum(1 for match in _PAGE_OBJECT.finditer(data) if match.start() < limit)
+        tail = data[max(limit, 0):]
+    pages = page_tree_count or page_objects
+    return {"page_count": pages} if pages else {}
+
+
+PARSERS: Dict[str, Callable[[ReadAt, int], Dict]] = {
+    "image/png": _png,
+    "image/gif": _gif,
+    "image/bmp": _bmp,
+    "image/webp": _webp,
+    "image/jpeg": _jpeg,
+    "video/mp4": _mp4,
+    "video/quicktime": _mp4,
+    "audio/mp4": _mp4,
+    "audio/wav": _wav,
+    "audio/flac": _flac,
+    "audio/mpeg": _mp3,
+    "application/pdf": _pdf,
+}
+
+
+def _local_reader(storage_key: str):
+    path = os.path.join(settings.LOCAL_UPLOADS_PATH, storage_key)
+    handle = open(path, "rb")
+
+    def read_at(offset: int, size: int) -> bytes:
+        handle.seek(offset)
+        return handle.read(size)
+
+    return read_at, os.path.getsize(path), handle.close
+
+
+def _s3_reader(storage_key: str, size: int):
+    from app.services.s3 import get_s3_client
+    client = get_s3_client()
+
+    def read_at(offset: int, length: int) -> bytes:
+        if offset >= size:
+            return b""
+        end = min(offset + length, size) - 1
+        response = client.get_object(Bucket=settings.AWS_S3_BUCKET, Key=storage_key, Range=f"bytes={offset}-{end}")
+        return response["Body"].read()
+
+    return read_at, size, lambda: None
+
+
+def extract_metadata(storage_type: str, storage_key: str, content_encoding: Optional[str], size: Optional[int]) -> Dict:
+    if content_encoding:
+        # Only text-like formats are compressed at rest; none has dimensions or a duration
+        with open_decompressed(os.path.join(settings.LOCAL_UPLOADS_PATH, storage_key), content_encoding) as f:
+            return {"mime_type": sniff_mime(f.read(HEAD_SIZE))}
+
+    if storage_type == "s3":
+        read_at, size, close = _s3_reader(storage_key, size or 0)
+    else:
+        read_at, size, close = _local_reader(storage_key)
+    try:
+        mime_type = sniff_mime(read_at(0, HEAD_SIZE))
+        attrs = {"mime_type": mime_type}
+        parser = PARSERS.get(mime_type)
+        if parser:
+            try:
+                attrs.update(parser(read_at, size))
+            except (struct.error, IndexError, ValueError, ZeroDivisionError):
+                logger.info("Could not parse %s header of %s", mime_type, storage_key)
+        return attrs
+    finally:
+        close()
+
+
+def extract_and_store(sha256: str, storage_type: str, storage_key: str, content_encoding: Optional[str], size: Optional[int]):
+    db = SessionLocal()
+    try:
+        if get_media_attributes(db, sha256) is not None:
+            return
+        attrs = extract_metadata(storage_type, storage_key, content_encoding, size)
+        save_media_attributes(db, sha256, attrs)
+    except IntegrityError:
+        # Another worker extracted the same content first
+        db.rollback()
+    except Exception:
+        db.rollback()
+        logger.exception("Metadata extraction failed for %s", storage_key)
+    finally:
+        db.close()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # Extraction is mostly ranged reads, so threads rather than processes
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=settings.METADATA_WORKERS, thread_name_prefix="media-metadata")
+    return _pool
+
+
+def media_source(f) -> Tuple[str, str, str, Optional[str], Optional[int]]:
+    # Plain values, so extraction never touches the request's session
+    return f.sha256, f.storage_type, f.storage_key, f.content_encoding, f.file_size
+
+
+def schedule_extraction(sources: Iterable[Tuple[str, str, str, Optional[str], Optional[int]]]):
+    """Queue extraction once per content digest; content that already has attributes is skipped by the worker."""
+    if settings.METADATA_WORKERS <= 0:
+        return
+    seen = set()
+    for sha256, storage_type, storage_key, content_encoding, size in sources:
+        if not sha256 or not storage_key or sha256 in seen:
+            continue
+        seen.add(sha256)
+        _get_pool().submit(extract_and_store, sha256, storage_type, storage_key, content_encoding, size)
+
+
+def shutdown_metadata_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def backfill(batch_size: int = 500) -> int:
+    # Extracts attributes for stored content that has none, e.g. files uploaded before extraction existed
+    # Keyset pagination on the digest, so content that fails to extract isn't retried forever
+    db = SessionLocal()
+    done = 0
+    after = ""
+    try:
+        while True:
+            batch = files_missing_attributes(db, after, batch_size)
+            if not batch:
+                return done
+            for sha256, storage_type, storage_key, content_encoding, size in batch:
+                extract_and_store(sha256, storage_type, storage_key, content_encoding, size)
+            done += len(batch)
+            after = batch[-1][0]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print({"extracted": backfill(args.batch_size)})
+
+
+if __name__ == "__main__":
+    main()
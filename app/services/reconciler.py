@@ -0,0 +1,179 @@
+"""Reconcile stored blobs with the rows that reference them.
+
+Walks the storage listing (S3 ListObjectsV2 pages, or an os.scandir walk of
+LOCAL_UPLOADS_PATH) and the referenced storage keys from the database, both
+in byte order, and merge-joins the two streams. Neither side is ever held in
+memory as a whole, so this scales to millions of objects. The result:
+
+- orphans: blobs no file or version references, e.g. left by an upload that
+  died between storing the blob and committing its row;
+- dangling: keys referenced by a file or version whose blob is missing.
+
+Both are only reported unless --delete-orphans / --delete-dangling is given.
+Blobs younger than RECONCILE_MIN_AGE_HOURS are never treated as orphans,
+since an upload in progress stores its blob before the row exists.
+
+Usage: python -m app.services.reconciler [--storage local|s3] [--delete-orphans] [--delete-dangling]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.crud.file import delete_dangling_rows, referenced_storage_keys, unreferenced_blobs
+from app.db.session import SessionLocal
+from app.services.blob_cleanup import purge_blobs
+
+logger = logging.getLogger(__name__)
+
+
+def iter_local_blobs(root: str, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    # Yields (key, mtime) in byte order of the full key. Directories sort as
+    # "name/", so "a.txt" comes before everything under "a/" as it does in the key order.
+    try:
+        with os.scandir(os.path.join(root, prefix) if prefix else root) as it:
+            entries = sorted(it, key=lambda e: e.name + "/" if e.is_dir(follow_symlinks=False) else e.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        key = f"{prefix}{entry.name}"
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_local_blobs(root, key + "/")
+        elif entry.is_file(follow_symlinks=False):
+            yield key, entry.stat(follow_symlinks=False).st_mtime
+
+
+def iter_s3_blobs(prefix: str = "") -> Iterator[Tuple[str, float]]:
+    # ListObjectsV2 returns keys in UTF-8 byte order, 1000 per page
+    from app.services.s3 import get_s3_client
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=settings.AWS_S3_BUCKET, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            yield obj["Key"], obj["LastModified"].timestamp()
+
+
+def blob_exists(storage_type: str, key: str) -> bool:
+    if storage_type == "local":
+        return os.path.isfile(os.path.join(settings.LOCAL_UPLOADS_PATH, key))
+    from botocore.exceptions import ClientError
+    from app.services.s3 import get_s3_client
+    try:
+        get_s3_client().head_object(Bucket=settings.AWS_S3_BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def iter_referenced_keys(db, storage_type: str, batch_size: int) -> Iterator[str]:
+    after = ""
+    while True:
+        keys = referenced_storage_keys(db, storage_type, after, batch_size)
+        if not keys:
+            return
+        yield from keys
+        after = keys[-1]
+
+
+def merge_join(blobs: Iterator[Tuple[str, float]], keys: Iterator[str]) -> Iterator[Tuple[str, str, Optional[float]]]:
+    # Both inputs sorted ascending; yields ("orphan", key, mtime) and ("dangling", key, None)
+    blob = next(blobs, None)
+    key = next(keys, None)
+    while blob is not None or key is not None:
+        if key is None or (blob is not None and blob[0] < key):
+            yield "orphan", blob[0], blob[1]
+            blob = next(blobs, None)
+        elif blob is None or key < blob[0]:
+            yield "dangling", key, None
+            key = next(keys, None)
+        else:
+            blob = next(blobs, None)
+            key = next(keys, None)
+
+
+def reconcile(
+    storage_type: str,
+    delete_orphans: bool = False,
+    delete_dangling: bool = False,
+    batch_size: Optional[int] = None,
+    min_age_hours: Optional[float] = None,
+    stop: Optional[threading.Event] = None,
+) -> Dict[str, int]:
+    batch_size = batch_size or settings.RECONCILE_BATCH_SIZE
+    min_age_hours = settings.RECONCILE_MIN_AGE_HOURS if min_age_hours is None else min_age_hours
+    cutoff = time.time() - min_age_hours * 3600
+    counts = {"orphans": 0, "orphans_deleted": 0, "recent_skipped": 0, "dangling": 0, "files_deleted": 0, "versions_deleted": 0}
+    orphans: List[Tuple[str, str]] = []
+    dangling: List[str] = []
+
+    # Keys are read on their own session; dangling deletes commit on another so the key stream is unaffected
+    key_db = SessionLocal()
+    db = SessionLocal()
+
+    # The walk and the key stream see different moments, so both findings are
+    # re-checked right before anything is deleted
+    def flush_orphans():
+        if delete_orphans and orphans:
+            confirmed = unreferenced_blobs(db, orphans)
+            purge_blobs(confirmed)
+            counts["orphans_deleted"] += len(confirmed)
+        orphans.clear()
+
+    def flush_dangling():
+        confirmed = [key for key in dangling if not blob_exists(storage_type, key)] if delete_dangling else []
+        if confirmed:
+            files, versions, freed = delete_dangling_rows(db, storage_type, confirmed)
+            purge_blobs(freed)
+            counts["files_deleted"] += files
+            counts["versions_deleted"] += versions
+        dangling.clear()
+
+    try:
+        blobs = iter_local_blobs(settings.LOCAL_UPLOADS_PATH) if storage_type == "local" else iter_s3_blobs()
+        for kind, key, mtime in merge_join(blobs, iter_referenced_keys(key_db, storage_type, batch_size)):
+            if stop and stop.is_set():
+                break
+            if kind == "orphan":
+                if mtime > cutoff:
+                    counts["recent_skipped"] += 1
+                    continue
+                counts["orphans"] += 1
+                logger.info("Orphaned %s blob: %s", storage_type, key)
+                orphans.append((storage_type, key))
+                if len(orphans) >= batch_size:
+                    flush_orphans()
+            else:
+                counts["dangling"] += 1
+                logger.warning("Missing %s blob referenced by the database: %s", storage_type, key)
+                dangling.append(key)
+                if len(dangling) >= batch_size:
+                    flush_dangling()
+        flush_orphans()
+        flush_dangling()
+    finally:
+        key_db.close()
+        db.close()
+    logger.info("Reconcile (%s): %s", storage_type, counts)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", choices=["local", "s3"], default=settings.STORAGE_BACKEND)
+    parser.add_argument("--delete-orphans", action="store_true")
+    parser.add_argument("--delete-dangling", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=settings.RECONCILE_BATCH_SIZE)
+    parser.add_argument("--min-age-hours", type=float, default=settings.RECONCILE_MIN_AGE_HOURS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    counts = reconcile(args.storage, args.delete_orphans, args.delete_dangling, args.batch_size, args.min_age_hours)
+    print(counts)
+
+
+if __name__ == "__main__":
+    main()
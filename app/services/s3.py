@@ -1,33 +1,65 @@
-import boto3
-import os
-from botocore.exceptions import NoCredentialsError
-from botocore.client import Config
+import hashlib
+import threading
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 from uuid import uuid4
 from app.core.config import settings
+from app.services.blob import StoredBlob, sha256_b64
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION,
-    config=Config(s3={"addressing_style": "virtual"})
-)
+_client = None
+_client_lock = threading.Lock()
 
-async def upload_file_to_s3(file: UploadFile, folder: str = ""):
+def get_s3_client():
+    # boto3 is slow to import and only needed with STORAGE_BACKEND=s3, so the
+    # client is built on first use. Client creation isn't thread-safe, hence the lock.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.client import Config
+                _client = boto3.client(
+                    "s3",
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    config=Config(s3={"addressing_style": "virtual"})
+                )
+    return _client
+
+async def upload_file_to_s3(file: UploadFile, folder: str = "") -> StoredBlob:
     ext = file.filename.split(".")[-1]
     key = f"{folder}/{uuid4()}.{ext}"
     content = await file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    from botocore.exceptions import NoCredentialsError
     try:
-        s3.put_object(Bucket=settings.AWS_S3_BUCKET, Key=key, Body=content)
-        return key
+        # boto3 is blocking; keep it off the event loop. S3 rejects the
+        # object if the bytes it received don't match ChecksumSHA256.
+        await run_in_threadpool(
+            get_s3_client().put_object,
+            Bucket=settings.AWS_S3_BUCKET,
+            Key=key,
+            Body=content,
+            ChecksumSHA256=sha256_b64(digest),
+        )
+        return StoredBlob(storage_key=key, size=len(content), sha256=digest)
     except NoCredentialsError:
         raise Exception("AWS credentials not found")
 
 def get_s3_download_url(key: str, expires_in=3600):
-    url = s3.generate_presigned_url(
+    url = get_s3_client().generate_presigned_url(
         'get_object',
         Params={'Bucket': settings.AWS_S3_BUCKET, 'Key': key},
         ExpiresIn=expires_in
     )
-    return url 
\ No newline at end of file
+    return url
+
+def delete_s3_objects(keys: list, batch_size: int = 1000):
+    # DeleteObjects accepts at most 1000 keys per call
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        get_s3_client().delete_objects(
+            Bucket=settings.AWS_S3_BUCKET,
+            Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+        )
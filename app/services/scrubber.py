@@ -0,0 +1,131 @@
+"""Background re-verification of local blobs against their stored SHA-256.
+
+Reads every local blob with a recorded digest at a throttled rate
+(SCRUB_RATE_MB_PER_SEC) so scrubbing never competes seriously with user
+traffic, and logs missing or corrupted blobs. S3 verifies object checksums
+itself, so only local storage is scrubbed.
+
+Usage: python -m app.services.scrubber [--rate-mb 20]
+"""
+import argparse
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.shared_state import get_shared_state
+from app.db.session import SessionLocal
+from app.models.file_version import FileVersion
+from app.services.local_storage import CHUNK_SIZE, DECOMPRESSION_ERRORS, open_decompressed
+
+logger = logging.getLogger(__name__)
+
+
+class Throttle:
+    def __init__(self, bytes_per_sec: float):
+        self.bytes_per_sec = bytes_per_sec
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, n: int):
+        self.consumed += n
+        ahead = self.consumed / self.bytes_per_sec - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def verify_blob(storage_key: str, content_encoding: Optional[str], sha256: str, throttle: Throttle) -> str:
+    file_path = os.path.join(settings.LOCAL_UPLOADS_PATH, storage_key)
+    digest = hashlib.sha256()
+    try:
+        with open_decompressed(file_path, content_encoding) as f:
+            while chunk := f.read(CHUNK_SIZE):
+                digest.update(chunk)
+                throttle.consume(len(chunk))
+    except FileNotFoundError:
+        return "missing"
+    except DECOMPRESSION_ERRORS:
+        # Unreadable, truncated or undecodable compressed data
+        return "corrupt"
+    return "ok" if digest.hexdigest() == sha256 else "corrupt"
+
+
+def scrub(rate_mb_per_sec: float, batch_size: int = 500, stop: Optional[threading.Event] = None) -> Dict[str, int]:
+    throttle = Throttle(rate_mb_per_sec * 1024 * 1024)
+    counts = {"ok": 0, "missing": 0, "corrupt": 0, "error": 0}
+    last_id = 0
+    verified = set()
+    while not (stop and stop.is_set()):
+        db = SessionLocal()
+        try:
+            # Every file has a row for its current version, so this covers old versions too
+            rows = db.query(
+                FileVersion.id, FileVersion.file_id, FileVersion.version,
+                FileVersion.storage_key, FileVersion.content_encoding, FileVersion.sha256,
+            ).filter(
+                FileVersion.storage_type == "local",
+                FileVersion.sha256.isnot(None),
+                FileVersion.id > last_id,
+            ).order_by(FileVersion.id).limit(batch_size).all()
+        finally:
+            # Don't hold a connection while reading blobs
+            db.close()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for row in rows:
+            if stop and stop.is_set():
+                break
+            # Versions sharing a blob only need it read once per pass
+            if row.storage_key in verified:
+                continue
+            verified.add(row.storage_key)
+            try:
+                status = verify_blob(row.storage_key, row.content_encoding, row.sha256, throttle)
+            except Exception:
+                # One unreadable blob must not stop the pass, or every pass would stop at it
+                logger.exception("Scrub: could not verify %s", row.storage_key)
+                counts["error"] += 1
+                continue
+            counts[status] += 1
+            if status != "ok":
+                logger.error("Scrub: file %d version %d (%s) is %s", row.file_id, row.version, row.storage_key, status)
+    logger.info("Scrub finished: %s", counts)
+    return counts
+
+
+def start_scrubber_thread() -> threading.Event:
+    # Runs a full pass every SCRUB_INTERVAL_HOURS; set the returned event to stop it.
+    # With several workers, the shared lease lets only one of them scrub per interval.
+    stop = threading.Event()
+    interval = settings.SCRUB_INTERVAL_HOURS * 3600
+
+    def loop():
+        while not stop.is_set():
+            try:
+                if get_shared_state().claim("job:scrub", interval):
+                    scrub(settings.SCRUB_RATE_MB_PER_SEC, stop=stop)
+            except Exception:
+                logger.exception("Scrub pass failed")
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="blob-scrubber", daemon=True).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate-mb", type=float, default=settings.SCRUB_RATE_MB_PER_SEC)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    counts = scrub(args.rate_mb)
+    print(counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Share link tokens, cached link state and batched download counters.
+
+A share token is a JWT carrying the link id, its target and expiry, so
+checking one is a signature check. What can change after issue (revocation,
+the download count and, for file links, which blob the file points at) is
+kept in a per-worker cache reloaded every SHARE_STATE_TTL_SECONDS; other
+workers see a revocation within that time. Downloads are counted in memory
+and added to the database in one batch every SHARE_COUNTER_FLUSH_SECONDS,
+so download limits are enforced per worker exactly and across workers to
+within one flush interval.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token, decode_token
+from app.crud.file import get_file
+from app.crud.media import get_media_attributes
+from app.crud.share import add_download_counts, get_share_link
+from app.db.session import SessionLocal
+from app.models.share_link import ShareLink
+from app.services.local_serving import media_type_for
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidShareToken(Exception):
+    pass
+
+
+def create_share_token(link: ShareLink, expires_at: Optional[datetime] = None, unlocked: bool = False) -> str:
+    # pw marks links that still need their password; the unlock endpoint issues a token without it
+    claims = {
+        "type": "share",
+        "lid": link.id,
+        "fid": link.file_id,
+        "did": link.folder_id,
+        "pw": bool(link.password_hash) and not unlocked,
+    }
+    expires_at = expires_at or link.expires_at
+    return create_access_token(claims, expires_delta=expires_at - datetime.utcnow())
+
+
+def decode_share_token(token: str) -> dict:
+    try:
+        claims = decode_token(token)
+    except JWTError:
+        raise InvalidShareToken("Invalid or expired link")
+    if claims.get("type") != "share" or "lid" not in claims:
+        raise InvalidShareToken("Invalid or expired link")
+    return claims
+
+
+class SharedBlob(NamedTuple):
+    file_id: int
+    filename: str
+    storage_type: str
+    storage_key: str
+    content_encoding: Optional[str]
+    file_size: Optional[int]
+    sha256: Optional[str]
+    media_type: str
+
+
+class LinkState(NamedTuple):
+    revoked: bool
+    max_downloads: Optional[int]
+    download_count: int
+    blob: Optional[SharedBlob]  # file links only; None once the file is gone
+
+
+def shared_blob(db: Session, file_id: int) -> Optional[SharedBlob]:
+    file = get_file(db, file_id)
+    if not file or not file.storage_key:
+        return None
+    attributes = get_media_attributes(db, file.sha256)
+    return SharedBlob(
+        file.id, file.filename, file.storage_type, file.storage_key, file.content_encoding, file.file_size,
+        file.sha256, media_type_for(file.filename, attributes.mime_type if attributes else None),
+    )
+
+
+class ShareLinkCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._states: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, link_id: int) -> Optional[LinkState]:
+        entry = self._states.get(link_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        link = get_share_link(db, link_id)
+        if link is None:
+            return None
+        state = LinkState(
+            link.revoked_at is not None,
+            link.max_downloads,
+            link.download_count or 0,
+            shared_blob(db, link.file_id) if link.file_id else None,
+        )
+        with self._lock:
+            self._states[link_id] = (time.monotonic() + self.ttl_seconds, state)
+        return state
+
+    def download_count(self, link_id: int, state: LinkState) -> int:
+        # The latest cached total, which may be newer than the state a request started with
+        entry = self._states.get(link_id)
+        return entry[1].download_count if entry else state.download_count
+
+    def add_downloads(self, counts: Dict[int, int]):
+        # Flushed counts move from the pending counter into the cached total
+        with self._lock:
+            for link_id, delta in counts.items():
+                entry = self._states.get(link_id)
+                if entry:
+                    expires, state = entry
+                    self._states[link_id] = (expires, state._replace(download_count=state.download_count + delta))
+
+    def invalidate(self, link_id: int):
+        with self._lock:
+            self._states.pop(link_id, None)
+
+
+class DownloadCounter:
+    def __init__(self):
+        self._pending: Dict[int, int] = defaultdict(int)
+        # Counts being written by a flush still count against the limit until the cache has them
+        self._flushing: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def try_record(self, link_id: int, state: LinkState) -> bool:
+        # Checks the limit and counts the download under one lock, so concurrent downloads can't all pass
+        with self._lock:
+            if state.max_downloads is not None:
+                used = link_cache.download_count(link_id, state) + self._unflushed(link_id)
+                if used >= state.max_downloads:
+                    return False
+            self._pending[link_id] += 1
+            return True
+
+    def _unflushed(self, link_id: int) -> int:
+        return self._pending.get(link_id, 0) + self._flushing.get(link_id, 0)
+
+    def pending(self, link_id: int) -> int:
+        with self._lock:
+            return self._unflushed(link_id)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = dict(self._pending), defaultdict(int)
+                self._flushing = counts
+            if not counts:
+                return
+            db = SessionLocal()
+            try:
+                add_download_counts(db, counts)
+                with self._lock:
+                    link_cache.add_downloads(counts)
+                    self._flushing = {}
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to flush share link download counts")
+                # Keep them for the next flush
+                with self._lock:
+                    self._flushing = {}
+                    for link_id, delta in counts.items():
+                        self._pending[link_id] += delta
+            finally:
+                db.close()
+
+
+link_cache = ShareLinkCache(settings.SHARE_STATE_TTL_SECONDS)
+download_counter = DownloadCounter()
+
+
+def downloads_left(link_id: int, state: LinkState) -> Optional[int]:
+    if state.max_downloads is None:
+        return None
+    return max(0, state.max_downloads - state.download_count - download_counter.pending(link_id))
+
+
+def unlock_expiry(link: ShareLink) -> datetime:
+    return min(link.expires_at, datetime.utcnow() + timedelta(minutes=settings.SHARE_UNLOCK_MINUTES))
+
+
+def start_counter_flush_thread() -> threading.Event:
+    # Flushes every SHARE_COUNTER_FLUSH_SECONDS and once more when the returned event is set
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(settings.SHARE_COUNTER_FLUSH_SECONDS):
+            download_counter.flush()
+        download_counter.flush()
+
+    threading.Thread(target=loop, name="share-download-counter", daemon=True).start()
+    return stop
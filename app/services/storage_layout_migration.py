@@ -0,0 +1,114 @@
+"""Move local blobs into the sharded layout and rewrite their storage_key.
+
+Each blob is hardlinked to its new sharded path, every file and version row
+pointing at it is rewritten and committed, and only then is the old path
+unlinked, once nothing references it any more. A crash at any point leaves
+every row pointing at a file that exists; at worst an old path lingers as an
+orphan.
+
+Usage: python -m app.services.storage_layout_migration [--workers 16] [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+from app.crud.file import unreferenced_blobs
+from app.db.session import SessionLocal
+from app.models.file import File
+from app.models.file_version import FileVersion
+from app.services.local_storage import is_sharded_key, sharded_key
+
+logger = logging.getLogger(__name__)
+
+
+def _link_blob(old_key: str) -> Tuple[str, Optional[str]]:
+    src = os.path.join(settings.LOCAL_UPLOADS_PATH, old_key)
+    name = os.path.basename(old_key)
+    new_key = sharded_key(name)
+    dst = os.path.join(settings.LOCAL_UPLOADS_PATH, new_key)
+    try:
+        # Same basename in two legacy folders: give the second one a fresh name.
+        # A link left by an interrupted earlier run is reused as-is.
+        if os.path.exists(dst) and not os.path.samefile(src, dst):
+            new_key = sharded_key(f"{uuid4()}-{name}")
+            dst = os.path.join(settings.LOCAL_UPLOADS_PATH, new_key)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if not os.path.exists(dst):
+            try:
+                os.link(src, dst)
+            except OSError:
+                # Filesystems without hardlinks: copy, the old path is removed after commit
+                shutil.copy2(src, dst)
+        return old_key, new_key
+    except FileNotFoundError:
+        logger.warning("Blob missing for storage_key %s, leaving row unchanged", old_key)
+        return old_key, None
+
+
+def _unlink_old(old_key: str):
+    try:
+        os.remove(os.path.join(settings.LOCAL_UPLOADS_PATH, old_key))
+    except FileNotFoundError:
+        pass
+
+
+def migrate(workers: int = 16, batch_size: int = 1000, dry_run: bool = False) -> int:
+    db = SessionLocal()
+    moved = 0
+    last_id = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Keyset pagination keeps each batch query an index range scan
+                rows = db.query(File.id, File.storage_key).filter(
+                    File.storage_type == "local",
+                    File.storage_key.isnot(None),
+                    File.id > last_id,
+                ).order_by(File.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                pending: List[str] = sorted({row.storage_key for row in rows if not is_sharded_key(row.storage_key)})
+                if not pending or dry_run:
+                    moved += len(pending)
+                    continue
+
+                linked = {old_key: new_key for old_key, new_key in pool.map(_link_blob, pending) if new_key}
+                # A blob can be shared by files and versions in any batch (dedup, copies),
+                # so every row pointing at it follows it to the new key, not just this batch's
+                for old_key, new_key in linked.items():
+                    for model in (File, FileVersion):
+                        db.query(model).filter(
+                            model.storage_type == "local", model.storage_key == old_key
+                        ).update({"storage_key": new_key}, synchronize_session=False)
+                db.commit()
+
+                freed = unreferenced_blobs(db, [("local", old_key) for old_key in linked])
+                list(pool.map(_unlink_old, [old_key for _, old_key in freed]))
+                moved += len(linked)
+                logger.info("Migrated %d blobs (last id %d)", moved, last_id)
+    finally:
+        db.close()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="only count blobs that would move")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    moved = migrate(args.workers, args.batch_size, args.dry_run)
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {moved} blobs")
+
+
+if __name__ == "__main__":
+    main()
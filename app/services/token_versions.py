@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Dict
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud.token import get_token_versions, bump_token_version
+
+
+class TokenVersionCache:
+    """In-memory copy of user_token_versions, reloaded every few seconds.
+
+    Lets get_current_user reject revoked tokens without a per-request query.
+    Revocations made by this process are applied immediately; revocations
+    made by other workers become visible after at most `refresh_seconds`.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._versions: Dict[int, int] = {}
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refresh_if_stale(self, db: Session):
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            self._versions = get_token_versions(db)
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, db: Session, user_id: int, version: int) -> bool:
+        self._refresh_if_stale(db)
+        return version < self._versions.get(user_id, 0)
+
+    def set(self, user_id: int, version: int):
+        self._versions[user_id] = version
+
+
+token_versions = TokenVersionCache(settings.TOKEN_VERSION_REFRESH_SECONDS)
+
+
+def revoke_user_tokens(db: Session, user_id: int):
+    token_versions.set(user_id, bump_token_version(db, user_id))
@@ -0,0 +1,79 @@
+"""Hard-delete trash older than TRASH_RETENTION_DAYS.
+
+Files go first, in batches of TRASH_PURGE_BATCH_SIZE rows per transaction,
+with their now-unreferenced blobs removed from local storage and S3 after
+each commit; then emptied folders, leaves first. Deletes from the API only
+set deleted_at, so all of the expensive work happens here.
+
+Usage: python -m app.services.trash_purger [--retention-days 30] [--batch-size 1000]
+"""
+import argparse
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.shared_state import get_shared_state
+from app.crud.trash import purge_expired_files, purge_expired_folders
+from app.db.session import SessionLocal
+from app.services.blob_cleanup import purge_blobs
+
+logger = logging.getLogger(__name__)
+
+
+def purge_trash(retention_days: int, batch_size: int, stop: Optional[threading.Event] = None) -> Dict[str, int]:
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    counts = {"files": 0, "folders": 0, "blobs": 0}
+    db = SessionLocal()
+    try:
+        while not (stop and stop.is_set()):
+            purged, blobs = purge_expired_files(db, cutoff, batch_size)
+            if not purged:
+                break
+            # Rows are already committed; a failed blob delete only leaves an orphan
+            purge_blobs(blobs)
+            counts["files"] += purged
+            counts["blobs"] += len(blobs)
+        while not (stop and stop.is_set()):
+            purged = purge_expired_folders(db, cutoff, batch_size)
+            if not purged:
+                break
+            counts["folders"] += purged
+    finally:
+        db.close()
+    if any(counts.values()):
+        logger.info("Trash purge: %s", counts)
+    return counts
+
+
+def start_trash_purger_thread() -> threading.Event:
+    # Runs every TRASH_PURGE_INTERVAL_MINUTES in one worker at a time; set the returned event to stop it
+    stop = threading.Event()
+    interval = settings.TRASH_PURGE_INTERVAL_MINUTES * 60
+
+    def loop():
+        while not stop.is_set():
+            try:
+                if get_shared_state().claim("job:trash-purge", interval):
+                    purge_trash(settings.TRASH_RETENTION_DAYS, settings.TRASH_PURGE_BATCH_SIZE, stop=stop)
+            except Exception:
+                logger.exception("Trash purge failed")
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="trash-purger", daemon=True).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--retention-days", type=int, default=settings.TRASH_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.TRASH_PURGE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(purge_trash(args.retention_days, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+
+def configure_environment(workdir: str, s3: bool):
+    # Settings are read at import time, so this must run before importing app.*
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["LOCAL_UPLOADS_PATH"] = os.path.join(workdir, "uploads")
+    os.environ["STORAGE_BACKEND"] = "s3" if s3 else "local"
+    # No proxy in front: the app must serve the bytes itself for downloads to be measured
+    os.environ["LOCAL_SERVE_MODE"] = "sendfile"
+    os.environ["ALGORITHM"] = "HS256"
+    if s3:
+        os.environ.setdefault("AWS_S3_BUCKET", "atc-drive-bench")
+        os.environ["AWS_ACCESS_KEY_ID"] = "bench"
+        os.environ["AWS_SECRET_ACCESS_KEY"] = "bench"
+        os.environ["AWS_REGION"] = "us-east-1"
+
+
+def start_s3_mock():
+    try:
+        from moto import mock_aws
+    except ImportError:  # moto < 5
+        from moto import mock_s3 as mock_aws
+    mock = mock_aws()
+    mock.start()
+
+    import boto3
+    boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=os.environ["AWS_S3_BUCKET"])
+    return mock
+
+
+def setup_app(s3: bool = False):
+    """Point the app at a throwaway SQLite DB / uploads dir and return (app, session_factory, s3_mock)."""
+    workdir = tempfile.mkdtemp(prefix="atc-bench-")
+    configure_environment(workdir, s3)
+    mock = start_s3_mock() if s3 else None
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.main import app
+    from app.api.deps import get_db
+    from app.db.base import Base
+
+    engine = create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_bench_db
+    return app, session_factory, mock
+
+
+def auth_headers(username: str) -> dict:
+    from app.core.security import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
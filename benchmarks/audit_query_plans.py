@@ -0,0 +1,111 @@
+"""Fail if a hot-path query falls back to a full table scan.
+
+Runs the real crud/read paths against an SQLite schema built from the models,
+captures every statement they issue and checks its EXPLAIN QUERY PLAN. Exits
+with status 1 and prints the offending plans when any hot table is scanned.
+
+Usage: python -m benchmarks.audit_query_plans
+"""
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import User, Folder, File, FolderPermission, RoleEnum, ChangeEvent
+from app.crud.change import get_changes_since, get_latest_change_id
+from app.crud.file import list_folder_files
+from app.crud.folder import (
+    delete_folder, list_visible_folders, get_user_permission_folders, get_folder_permission_emails,
+)
+from app.crud.trash import list_trashed_files, list_trashed_folders
+from app.schemas.file import FileListFilters
+
+HOT_TABLES = {"files", "folders", "folder_permissions", "file_versions", "media_attributes", "change_log"}
+_FULL_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def hot_paths(db, user_id: int, folder_id: int, empty_folder_id: int):
+    # The same crud calls the endpoints make, so the live-row filters the partial indexes rely on are included
+    yield "list_files", lambda: list_folder_files(db, folder_id, FileListFilters())
+    yield "list_files (image/*, by width)", lambda: list_folder_files(
+        db, folder_id, FileListFilters(mime_type="image/*", sort="width")
+    )
+    yield "list_folders (admin)", lambda: list_visible_folders(db, folder_id)
+    yield "list_folders (root, user)", lambda: list_visible_folders(db, None, user_id)
+    yield "list_folders (child, user)", lambda: list_visible_folders(db, folder_id, user_id)
+    yield "permission check", lambda: db.query(FolderPermission).filter(
+        FolderPermission.folder_id == folder_id,
+        FolderPermission.user_id == user_id,
+        FolderPermission.permission == RoleEnum.editor,
+    ).first()
+    yield "folder permissions", lambda: get_folder_permission_emails(db, folder_id)
+    yield "user folder permissions", lambda: get_user_permission_folders(db, user_id)
+    yield "files by uploader", lambda: db.query(File.id).filter(File.uploaded_by == user_id).all()
+    yield "trash (admin)", lambda: (list_trashed_files(db), list_trashed_folders(db))
+    yield "trash (user)", lambda: list_trashed_files(db, user_id)
+    yield "changes (admin)", lambda: get_changes_since(db, 0, get_latest_change_id(db), None, 500)
+    yield "changes (user)", lambda: get_changes_since(db, 0, get_latest_change_id(db), user_id, 500)
+    yield "delete_folder", lambda: delete_folder(db, empty_folder_id)
+
+
+def seed(db):
+    user = User(username="audit", email="audit@example.com", hashed_password="x", role=RoleEnum.editor)
+    db.add(user)
+    db.flush()
+    root = Folder(name="root", owner_id=user.id)
+    db.add(root)
+    db.flush()
+    child = Folder(name="child", parent_id=root.id, owner_id=user.id)
+    empty = Folder(name="empty", parent_id=root.id, owner_id=user.id)
+    db.add_all([child, empty])
+    db.flush()
+    db.add_all([
+        FolderPermission(folder_id=root.id, user_id=user.id, permission=RoleEnum.editor),
+        FolderPermission(folder_id=child.id, user_id=user.id, permission=RoleEnum.viewer),
+        File(filename="a.txt", folder_id=child.id, uploaded_by=user.id, storage_type="local", storage_key="a.txt"),
+        File(filename="b.txt", folder_id=child.id, uploaded_by=user.id, storage_type="local", storage_key="b.txt",
+             deleted_at=datetime.utcnow()),
+        ChangeEvent(entity_type="file", entity_id=1, action="create", folder_id=child.id, name="a.txt"),
+    ])
+    db.commit()
+    return user.id, root.id, empty.id
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user_id, folder_id, empty_folder_id = seed(db)
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE")):
+            captured.append((statement, parameters))
+
+    failures = 0
+    for name, run in hot_paths(db, user_id, folder_id, empty_folder_id):
+        captured.clear()
+        run()
+        statements = list(captured)
+        for statement, parameters in statements:
+            with engine.connect() as conn:
+                plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            scans = [line for line in plan if (m := _FULL_SCAN.match(line)) and m.group(1) in HOT_TABLES]
+            status = "FAIL" if scans else "ok"
+            print(f"[{status}] {name}: {' | '.join(plan)}")
+            if scans:
+                failures += 1
+                print(f"       {' '.join(statement.split())}")
+
+    if failures:
+        print(f"{failures} hot-path statement(s) use a full table scan")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure event-loop lag while uploads are in flight.
+
+Drives the app over an in-process ASGI transport so requests and a lag probe
+share one event loop: any blocking disk, DB or boto3 call in the async upload
+path shows up directly as probe overshoot. Exits with status 1 when the worst
+observed lag exceeds --max-lag-ms.
+
+Usage: python -m benchmarks.bench_event_loop_lag [--uploads 20] [--size-mb 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.app_env import setup_app, auth_headers
+from benchmarks.harness import percentile
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def run(app, headers, uploads: int, payload: bytes):
+    import httpx
+
+    samples = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        probe = asyncio.create_task(probe_lag(stop, samples))
+        responses = await asyncio.gather(*[
+            client.post(
+                "/api/files/upload", params={"folder_id": 1},
+                files=[("files", (f"lag-{i}.bin", payload, "application/octet-stream"))], headers=headers,
+            )
+            for i in range(uploads)
+        ])
+        stop.set()
+        await probe
+    for response in responses:
+        response.raise_for_status()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--max-lag-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    app, session_factory, _ = setup_app()
+
+    from benchmarks.seed import seed_users, seed_tree
+
+    db = session_factory()
+    admin, viewer = seed_users(db)
+    seed_tree(db, admin.id, viewer.id, folders=1, files=0)
+    headers = auth_headers(admin.username)
+    db.close()
+
+    samples = asyncio.run(run(app, headers, args.uploads, os.urandom(args.size_mb * 1024 * 1024)))
+    worst = max(samples) if samples else 0.0
+    print(
+        f"{args.uploads} x {args.size_mb}MB uploads: probes={len(samples)} "
+        f"p50={percentile(samples, 50):.2f}ms p99={percentile(samples, 99):.2f}ms max={worst:.2f}ms"
+    )
+    if worst > args.max_lag_ms:
+        print(f"Event-loop lag exceeded {args.max_lag_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Throughput / latency benchmark for the upload, download and listing endpoints.
+
+Runs the real FastAPI app in-process against SQLite and local storage, or
+against a moto-mocked S3 bucket with --s3. Results are written as JSON so
+runs can be compared with `python -m benchmarks.compare OLD.json NEW.json`.
+
+Usage: python -m benchmarks.bench_hot_paths [--files 100000] [--folders 10000] [--s3]
+"""
+import argparse
+import os
+
+from benchmarks.app_env import setup_app, auth_headers
+from benchmarks.harness import measure, max_rss_mb, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--folders", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--upload-size", type=int, default=64 * 1024, help="bytes per uploaded file")
+    parser.add_argument("--s3", action="store_true", help="use a moto-mocked S3 bucket instead of local storage")
+    parser.add_argument("--trace-memory", action="store_true", help="record Python heap peaks (slower)")
+    parser.add_argument("--output", default="benchmarks/results")
+    args = parser.parse_args()
+
+    app, session_factory, mock = setup_app(args.s3)
+
+    from fastapi.testclient import TestClient
+    from benchmarks.seed import seed_users, seed_tree
+
+    db = session_factory()
+    admin, viewer = seed_users(db)
+    print(f"Seeding {args.folders} folders and {args.files} files...")
+    seed_tree(db, admin.id, viewer.id, args.folders, args.files)
+    admin_headers = auth_headers(admin.username)
+    viewer_headers = auth_headers(viewer.username)
+    db.close()
+
+    client = TestClient(app)
+    payload = os.urandom(args.upload_size)
+    uploaded_ids = []
+
+    def upload(i):
+        response = client.post(
+            "/api/files/upload",
+            params={"folder_id": i % args.folders + 1},
+            files=[("files", (f"upload-{i}.bin", payload, "application/octet-stream"))],
+            headers=admin_headers,
+        )
+        response.raise_for_status()
+        uploaded_ids.extend(item["id"] for item in response.json())
+
+    def download(i):
+        response = client.get(f"/api/files/{uploaded_ids[i % len(uploaded_ids)]}/download", headers=admin_headers)
+        response.raise_for_status()
+
+    def list_files(i):
+        client.get("/api/files/", params={"folder_id": i % args.folders + 1}, headers=admin_headers).raise_for_status()
+
+    def list_folders_admin(i):
+        client.get("/api/folders/", params={"parent_id": i % (args.folders // 10) + 1}, headers=admin_headers).raise_for_status()
+
+    def list_folders_viewer(i):
+        client.get("/api/folders/", params={"parent_id": i % (args.folders // 10) + 1}, headers=viewer_headers).raise_for_status()
+
+    scenarios = [
+        ("upload_files", upload),
+        ("download_file", download),
+        ("list_files", list_files),
+        ("list_folders_admin", list_folders_admin),
+        ("list_folders_viewer", list_folders_viewer),
+    ]
+    results = [measure(name, fn, args.iterations, trace_memory=args.trace_memory) for name, fn in scenarios]
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    params["backend"] = "s3" if args.s3 else "local"
+    params["final_max_rss_mb"] = max_rss_mb()
+    print(f"Results written to {write_results(results, params, args.output)}")
+
+    if mock is not None:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
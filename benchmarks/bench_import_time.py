@@ -0,0 +1,98 @@
+"""Track cold-start import time of app.main.
+
+Each sample imports app.main in a fresh interpreter (so nothing is cached in
+sys.modules), minus the median startup time of a bare interpreter. Also
+checks that optional heavy dependencies stay unloaded when unused and lists
+the slowest imports from `python -X importtime`. Results use the harness
+format so `benchmarks.compare` can flag cold-start regressions. Exits with
+status 1 when p50 exceeds --max-ms or a lazy dependency was imported.
+
+Usage: python -m benchmarks.bench_import_time [--runs 15] [--max-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.app_env import configure_environment
+from benchmarks.harness import percentile, write_results
+
+# Must not be imported by `import app.main` with STORAGE_BACKEND=local
+LAZY_MODULES = ["boto3", "botocore", "redis", "moto"]
+
+
+def time_runs(code: str, runs: int, env: dict) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def slowest_imports(env: dict, top: int) -> List[tuple]:
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].strip().split(":")[-1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), int(parts[0].split(":")[-1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", default="benchmarks/results")
+    args = parser.parse_args()
+
+    configure_environment(tempfile.mkdtemp(prefix="atc-bench-"), s3=False)
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+
+    baseline = percentile(time_runs("pass", args.runs, env), 50)
+    samples = [s - baseline for s in time_runs("import app.main", args.runs, env)]
+    result = {
+        "name": "import app.main",
+        "iterations": args.runs,
+        "throughput_ops": 1000 / percentile(samples, 50) if percentile(samples, 50) > 0 else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples),
+        "interpreter_ms": baseline,
+    }
+    print(f"import app.main: p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms (interpreter {baseline:.1f}ms)")
+
+    print(f"\n{'cumulative':>12} {'self':>10}  module")
+    for cumulative, self_us, module in slowest_imports(env, args.top):
+        print(f"{cumulative / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {module}")
+
+    check = subprocess.run(
+        [sys.executable, "-c", f"import sys, app.main; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    loaded = check.stdout.split()
+    print(f"Results written to {write_results([result], vars(args), args.output)}")
+
+    failed = False
+    if loaded:
+        print(f"Imported eagerly but only needed lazily: {', '.join(loaded)}")
+        failed = True
+    if result["p50_ms"] > args.max_ms:
+        print(f"Cold import exceeded {args.max_ms}ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measure listing/download latency with and without a concurrent login burst.
+
+bcrypt verification runs in a dedicated process pool, so a burst of logins
+should leave the p99 of file traffic roughly where it was when idle.
+
+Usage: python -m benchmarks.bench_login_burst [--logins 500] [--concurrency 32]
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.app_env import setup_app, auth_headers
+from benchmarks.harness import measure, write_results
+
+PASSWORD = "burst-password"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", default="benchmarks/results")
+    args = parser.parse_args()
+
+    app, session_factory, _ = setup_app()
+
+    from fastapi.testclient import TestClient
+    from app.core.security import get_password_hash
+    from app.models import User, RoleEnum
+    from benchmarks.seed import seed_users, seed_tree
+
+    db = session_factory()
+    admin, viewer = seed_users(db)
+    seed_tree(db, admin.id, viewer.id, folders=1000, files=10000)
+    db.add(User(username="burst", email="burst@bench.local", hashed_password=get_password_hash(PASSWORD), role=RoleEnum.viewer))
+    db.commit()
+    headers = auth_headers(admin.username)
+    db.close()
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/files/upload", params={"folder_id": 1},
+            files=[("files", ("burst.bin", os.urandom(64 * 1024), "application/octet-stream"))], headers=headers,
+        )
+        response.raise_for_status()
+        file_id = response.json()[0]["id"]
+
+        def list_files(i):
+            client.get("/api/files/", params={"folder_id": i % 1000 + 1}, headers=headers).raise_for_status()
+
+        def download(i):
+            client.get(f"/api/files/{file_id}/download", headers=headers).raise_for_status()
+
+        def login(_):
+            # 503 from admission control is an expected outcome under burst
+            client.post("/api/users/login", json={"username": "burst", "password": PASSWORD})
+
+        results = [
+            measure("list_files (idle)", list_files, args.iterations),
+            measure("download_file (idle)", download, args.iterations),
+        ]
+
+        stop = threading.Event()
+
+        def burst():
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                while not stop.is_set():
+                    list(pool.map(login, range(args.logins)))
+
+        burst_thread = threading.Thread(target=burst, daemon=True)
+        burst_thread.start()
+        try:
+            results.append(measure("list_files (login burst)", list_files, args.iterations))
+            results.append(measure("download_file (login burst)", download, args.iterations))
+        finally:
+            stop.set()
+            burst_thread.join()
+
+    print(f"Results written to {write_results(results, vars(args), args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the old lazy-loading permission reads with the projection queries.
+
+Usage: python -m benchmarks.bench_permissions [--permissions 10000]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import User, Folder, FolderPermission, RoleEnum
+from app.crud.folder import get_folder_permission_emails, get_user_permission_folders
+from app.core.profiling import profile_sql
+
+
+def seed(db, permissions: int):
+    owner = User(username="owner", email="owner@example.com", hashed_password="x", role=RoleEnum.admin)
+    db.add(owner)
+    db.flush()
+    folder = Folder(name="shared", owner_id=owner.id)
+    db.add(folder)
+    db.flush()
+
+    db.bulk_insert_mappings(User, [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x", "role": RoleEnum.viewer}
+        for i in range(permissions)
+    ])
+    user_ids = [row.id for row in db.query(User.id).filter(User.id != owner.id)]
+    db.bulk_insert_mappings(FolderPermission, [
+        {"folder_id": folder.id, "user_id": user_id, "permission": RoleEnum.viewer} for user_id in user_ids
+    ])
+
+    # One user with access to many folders for the per-user listing
+    db.bulk_insert_mappings(Folder, [{"name": f"f{i}", "owner_id": owner.id} for i in range(permissions)])
+    folder_ids = [row.id for row in db.query(Folder.id).filter(Folder.id != folder.id)]
+    db.bulk_insert_mappings(FolderPermission, [
+        {"folder_id": folder_id, "user_id": user_ids[0], "permission": RoleEnum.viewer} for folder_id in folder_ids
+    ])
+    db.commit()
+    return folder.id, user_ids[0]
+
+
+def run(label: str, session_factory, fn):
+    db = session_factory()
+    try:
+        with profile_sql() as profile:
+            start = time.perf_counter()
+            result = fn(db)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{label:<40} rows={len(result):>6} queries={profile.count:>6} time={elapsed_ms:>9.1f}ms")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--permissions", type=int, default=10000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    folder_id, user_id = seed(db, args.permissions)
+    db.close()
+
+    run("folder permissions (lazy user load)", session_factory, lambda db: [
+        perm.user.email for perm in db.query(FolderPermission).filter(FolderPermission.folder_id == folder_id).all()
+    ])
+    run("folder permissions (projection)", session_factory, lambda db: get_folder_permission_emails(db, folder_id))
+    run("user folders (ORM objects)", session_factory, lambda db: (
+        db.query(Folder).join(FolderPermission).filter(FolderPermission.user_id == user_id).all()
+    ))
+    run("user folders (projection)", session_factory, lambda db: get_user_permission_folders(db, user_id))
+
+
+if __name__ == "__main__":
+    main()
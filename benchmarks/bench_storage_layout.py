@@ -0,0 +1,67 @@
+"""Compare blob create and lookup latency for flat vs sharded directories.
+
+Creates --files empty blobs in a single flat directory and in the ab/cd/
+sharded layout, then stats a random sample of existing and missing keys.
+
+Usage: python -m benchmarks.bench_storage_layout [--files 1000000] [--samples 10000] [--dir /mnt/disk/tmp]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from uuid import uuid4
+
+from app.services.local_storage import sharded_key
+from benchmarks.harness import percentile
+
+
+def flat_key(name: str) -> str:
+    return os.path.join("flat", name)
+
+
+def run_layout(root: str, label: str, key_fn, names, samples: int):
+    create_ms = []
+    for name in names:
+        path = os.path.join(root, key_fn(name))
+        t0 = time.perf_counter()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+        create_ms.append((time.perf_counter() - t0) * 1000)
+
+    hits = random.sample(names, min(samples, len(names)))
+    misses = [f"{uuid4()}.bin" for _ in range(samples)]
+    lookup_ms = []
+    for name in hits + misses:
+        path = os.path.join(root, key_fn(name))
+        t0 = time.perf_counter()
+        os.path.exists(path)
+        lookup_ms.append((time.perf_counter() - t0) * 1000)
+
+    print(
+        f"{label:<8} create p50={percentile(create_ms, 50):.3f}ms p99={percentile(create_ms, 99):.3f}ms  "
+        f"lookup p50={percentile(lookup_ms, 50):.3f}ms p99={percentile(lookup_ms, 99):.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--dir", default=None, help="parent directory on the filesystem under test")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="atc-layout-", dir=args.dir)
+    names = [f"{uuid4()}.bin" for _ in range(args.files)]
+    try:
+        run_layout(root, "flat", flat_key, names, args.samples)
+        # Drop the flat tree first so both layouts see a similar page cache state
+        shutil.rmtree(os.path.join(root, "flat"))
+        run_layout(root, "sharded", sharded_key, names, args.samples)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 10]
+Exits with status 1 if any scenario's p50/p99 latency grew or throughput
+dropped by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+
+
+def pct_change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {r["name"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"{'scenario':<28} {'ops/s':>9} {'p50':>9} {'p99':>9}")
+    for name, new in candidate.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<28} (new scenario)")
+            continue
+        throughput = pct_change(old["throughput_ops"], new["throughput_ops"])
+        p50 = pct_change(old["p50_ms"], new["p50_ms"])
+        p99 = pct_change(old["p99_ms"], new["p99_ms"])
+        print(f"{name:<28} {throughput:>+8.1f}% {p50:>+8.1f}% {p99:>+8.1f}%")
+        if throughput < -args.threshold or p50 > args.threshold or p99 > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
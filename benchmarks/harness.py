@@ -0,0 +1,81 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if platform.system() == "Darwin" else rss / 1024
+
+
+def measure(name: str, fn: Callable[[int], object], iterations: int, warmup: int = 5, trace_memory: bool = False) -> Dict:
+    for i in range(warmup):
+        fn(i)
+
+    if trace_memory:
+        tracemalloc.start()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    wall = time.perf_counter() - started
+    peak_mb = None
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "throughput_ops": iterations / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else 0.0,
+        "python_peak_mb": peak_mb,
+        "max_rss_mb": max_rss_mb(),
+    }
+    print(
+        f"{name:<28} {result['throughput_ops']:>9.1f} ops/s  p50={result['p50_ms']:>8.2f}ms  "
+        f"p99={result['p99_ms']:>8.2f}ms  rss={result['max_rss_mb']:.0f}MB"
+    )
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(results: List[Dict], params: Dict, output_dir: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(output_dir, f"{stamp}-{git_revision()}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "timestamp": stamp,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "params": params,
+            "results": results,
+        }, f, indent=2)
+    return path
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.models import User, Folder, File, FolderPermission, RoleEnum
+
+BATCH_SIZE = 5000
+
+
+def seed_users(db):
+    admin = User(username="bench_admin", email="admin@bench.local", hashed_password="x", role=RoleEnum.admin)
+    viewer = User(username="bench_viewer", email="viewer@bench.local", hashed_password="x", role=RoleEnum.viewer)
+    db.add_all([admin, viewer])
+    db.commit()
+    return admin, viewer
+
+
+def _batched_insert(db, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def seed_tree(db, admin_id: int, viewer_id: int, folders: int, files: int, fanout: int = 10):
+    # Folder i hangs under folder (i - 1) // fanout, giving a tree `fanout` wide
+    folder_rows = [{"id": 1, "name": "root", "parent_id": None, "owner_id": admin_id}]
+    for i in range(2, folders + 1):
+        folder_rows.append({"id": i, "name": f"folder-{i}", "parent_id": (i - 2) // fanout + 1, "owner_id": admin_id})
+    _batched_insert(db, Folder.__table__, folder_rows)
+    _batched_insert(db, FolderPermission.__table__, [
+        {"folder_id": row["id"], "user_id": viewer_id, "permission": RoleEnum.viewer} for row in folder_rows
+    ])
+
+    now = datetime.utcnow()
+    _batched_insert(db, File.__table__, [
+        {
+            "filename": f"file-{i}.bin",
+            "folder_id": i % folders + 1,
+            "uploaded_by": admin_id,
+            "storage_type": "local",
+            "storage_key": f"seed/{i}.bin",
+            "file_size": 0,
+            "created_at": now,
+        }
+        for i in range(files)
+    ])
+    db.commit()
+
@@ -0,0 +1,26 @@
+# Production serving: gunicorn -c gunicorn.conf.py app.main:app
+import os
+
+from app.core.config import settings
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = settings.worker_count
+worker_class = "app.core.serving.DrainingUvicornWorker"
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+# A stopping worker gets this long to finish in-flight uploads and downloads before it is killed
+graceful_timeout = int(settings.DRAIN_TIMEOUT_SECONDS) + 5
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+
+def on_starting(server):
+    from app.core.serving import warn_on_single_process_state
+    warn_on_single_process_state()
+
+
+def post_fork(server, worker):
+    from app.core.serving import reset_after_fork
+    reset_after_fork()